@@ -0,0 +1,220 @@
+"""Local stand-ins for the Practicum homework_statuses API and Telegram.
+
+Both servers run in one process and share the time every homework changed
+its status, so the Telegram side can measure notification latency: from
+the moment a status changed upstream to the moment the bot delivered it.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+STATUS_CYCLE = ('reviewing', 'rejected', 'reviewing', 'approved')
+HOMEWORK_NAME = re.compile(r'"(hw-[^"]+)"')
+
+
+def iso(moment) -> str:
+    """Format a timestamp the way the Practicum API does."""
+    return datetime.fromtimestamp(moment, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+class Upstream:
+    """Homework histories of every token and delivery receipts."""
+
+    def __init__(self, change_interval, history_size, comment_size):
+        """Build the old history every token starts with."""
+        self.change_interval = change_interval
+        self.started = time.time()
+        self.history = [
+            {
+                'id': -number,
+                'status': 'approved',
+                'homework_name': f'old-{number}',
+                'reviewer_comment': 'x' * comment_size,
+                'date_updated': iso(self.started - 86400),
+                'lesson_name': 'История',
+            }
+            for number in range(1, history_size + 1)
+        ]
+        self.offsets = {}
+        self.changed_at = {}
+        self.latencies = []
+        self.requests = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+
+    def homeworks(self, token, from_date) -> list:
+        """Return homeworks of a token changed since `from_date`."""
+        now = time.time()
+        with self.lock:
+            self.requests += 1
+            offset = self.offsets.setdefault(
+                token, random.uniform(0, self.change_interval)
+            )
+        step = int((now - self.started - offset) // self.change_interval)
+        if step < 0:
+            return list(self.history)
+        changed = self.started + offset + step * self.change_interval
+        name = f'hw-{token}-{step // len(STATUS_CYCLE)}'
+        status = STATUS_CYCLE[step % len(STATUS_CYCLE)]
+        with self.lock:
+            self.changed_at[name] = changed
+        homeworks = list(self.history)
+        if changed >= from_date:
+            homeworks.insert(0, {
+                'id': hash(name) & 0xffffffff,
+                'status': status,
+                'homework_name': name,
+                'reviewer_comment': '',
+                'date_updated': iso(changed),
+                'lesson_name': 'Бенчмарк',
+            })
+        return homeworks
+
+    def received(self, text):
+        """Record latency of every tracked status mentioned in a message."""
+        now = time.time()
+        with self.lock:
+            self.messages += 1
+            for name in HOMEWORK_NAME.findall(text):
+                changed = self.changed_at.get(name)
+                if changed is not None:
+                    self.latencies.append(now - changed)
+
+    def stats(self) -> dict:
+        """Return counters and latency percentiles."""
+        with self.lock:
+            latencies = sorted(self.latencies)
+
+        def percentile(share):
+            if not latencies:
+                return None
+            return latencies[min(int(len(latencies) * share),
+                                 len(latencies) - 1)]
+
+        return {
+            'requests': self.requests,
+            'messages': self.messages,
+            'notifications': len(latencies),
+            'p50': percentile(0.5),
+            'p99': percentile(0.99),
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Serves both APIs; behaviour comes from the server attributes."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def reply(self, status, payload):
+        """Send a JSON answer."""
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def delay_or_fail(self) -> bool:
+        """Apply the configured latency and maybe answer with an error."""
+        time.sleep(self.server.latency)
+        if random.random() < self.server.error_rate:
+            self.reply(HTTPStatus.INTERNAL_SERVER_ERROR, {'ok': False})
+            return True
+        return False
+
+    def do_GET(self):
+        """Answer homework_statuses and /stats requests."""
+        url = urlparse(self.path)
+        upstream = self.server.upstream
+        if url.path == '/stats':
+            self.reply(HTTPStatus.OK, upstream.stats())
+            return
+        if self.delay_or_fail():
+            return
+        token = self.headers.get('Authorization', '').replace('OAuth ', '')
+        from_date = int(parse_qs(url.query).get('from_date', ['0'])[0])
+        self.reply(HTTPStatus.OK, {
+            'homeworks': upstream.homeworks(token, from_date),
+            'current_date': int(time.time()),
+        })
+
+    def do_POST(self):
+        """Accept a Bot API sendMessage call."""
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length).decode()
+        if self.delay_or_fail():
+            return
+        if self.headers.get('Content-Type', '').startswith('application/json'):
+            data = json.loads(raw or '{}')
+        else:
+            data = {key: value[0] for key, value in parse_qs(raw).items()}
+        self.server.upstream.received(data.get('text', ''))
+        self.reply(HTTPStatus.OK, {'ok': True, 'result': {
+            'message_id': 1,
+            'date': int(time.time()),
+            'chat': {'id': int(data.get('chat_id', 0)), 'type': 'private'},
+            'text': data.get('text', ''),
+        }})
+
+    def log_message(self, format, *args):
+        """Stay quiet."""
+        pass
+
+
+def make_server(upstream, port=0, latency=0.0, error_rate=0.0):
+    """Create a server for one of the APIs."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.upstream = upstream
+    server.latency = latency
+    server.error_rate = error_rate
+    return server
+
+
+def serve(ready, practicum_port=0, telegram_port=0, api_latency=0.0,
+          api_error_rate=0.0, telegram_latency=0.0, telegram_error_rate=0.0,
+          change_interval=30.0, history_size=0, comment_size=200):
+    """Run both servers forever; ports are reported through `ready`."""
+    upstream = Upstream(change_interval, history_size, comment_size)
+    practicum = make_server(
+        upstream, practicum_port, api_latency, api_error_rate
+    )
+    telegram = make_server(
+        upstream, telegram_port, telegram_latency, telegram_error_rate
+    )
+    threading.Thread(target=telegram.serve_forever, daemon=True).start()
+    ready.put((practicum.server_port, telegram.server_port))
+    practicum.serve_forever()
+
+
+if __name__ == '__main__':
+    import queue
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--practicum-port', type=int, default=8081)
+    parser.add_argument('--telegram-port', type=int, default=8082)
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--change-interval', type=float, default=30.0)
+    parser.add_argument('--history-size', type=int, default=0)
+    args = parser.parse_args()
+    ports = queue.Queue()
+    threading.Thread(target=lambda: print(
+        'Practicum: http://127.0.0.1:%d, Telegram: http://127.0.0.1:%d'
+        % ports.get()
+    )).start()
+    serve(
+        ports, args.practicum_port, args.telegram_port,
+        api_latency=args.api_latency, api_error_rate=args.api_error_rate,
+        change_interval=args.change_interval, history_size=args.history_size,
+    )
@@ -0,0 +1,71 @@
+"""Replay a recorded traffic trace through the real pipeline.
+
+Record a trace on a running worker with TRAFFIC_RECORD=trace.jsonl.gz,
+then measure parsing, change detection and delivery against it:
+
+    python benchmarks/replay.py trace.jsonl.gz --runs 5
+    python benchmarks/replay.py trace.jsonl.gz --speed 1
+
+Every run starts from an empty state, so the same notifications are
+produced each time. Telegram is replaced by an in-memory bot.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import homework  # noqa: E402
+import storage  # noqa: E402
+import traffic  # noqa: E402
+
+
+def replay_once(path, speed) -> dict:
+    """Replay the trace once against a fresh state."""
+    bot = traffic.ReplayBot()
+    with tempfile.TemporaryDirectory() as state_dir:
+        store = storage.open_store(
+            'sqlite', os.path.join(state_dir, 'state.db')
+        )
+        try:
+            result = homework.replay_trace(path, store, bot, speed)
+        finally:
+            store.close()
+    result['sent'] = len(bot.sent)
+    return result
+
+
+def main(argv=None):
+    """Replay a trace several times and print the median figures."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('trace')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--speed', type=float,
+                        help='recorded pace multiplier; full speed if unset')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args(argv)
+    results = [replay_once(args.trace, args.speed) for _ in range(args.runs)]
+    events = sum(results[0]['events'].values())
+    seconds = statistics.median(result['seconds'] for result in results)
+    summary = {
+        'events': results[0]['events'],
+        'subscriptions': results[0]['subscriptions'],
+        'recorded_sends': results[0]['events'].get('send', 0),
+        'replayed_sends': results[0]['sent'],
+        'seconds': seconds,
+        'events_per_second': events / seconds if seconds else None,
+    }
+    for name, value in summary.items():
+        print(f'{name:>18}: {value}')
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=2)
+    return summary
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Throughput benchmark of the poll path against local fake servers.
+
+Starts the fake Practicum and Telegram APIs in a separate process, so the
+CPU and memory figures belong to the bot alone, then drives the real
+homework.py pipeline for a fixed time at every requested subscription
+count:
+
+    python benchmarks/run_benchmark.py --subscriptions 1 100 10000
+
+Reports polls per second, p50/p99 notification latency (from a status
+change upstream to its delivery to Telegram), CPU usage and RSS.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import homework  # noqa: E402
+import storage  # noqa: E402
+import telegram  # noqa: E402
+from delivery import DeliveryQueue  # noqa: E402
+from fake_servers import serve  # noqa: E402
+from scheduler import AdaptiveScheduler  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+from thread_poller import ThreadPoller  # noqa: E402
+
+BOT_TOKEN = '123456:benchmark'
+
+
+def start_servers(args):
+    """Run the fake APIs in a child process and return their URLs."""
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(ready,), kwargs={
+        'api_latency': args.api_latency,
+        'api_error_rate': args.api_error_rate,
+        'telegram_latency': args.telegram_latency,
+        'telegram_error_rate': args.telegram_error_rate,
+        'change_interval': args.change_interval,
+        'history_size': args.history_size,
+    }, daemon=True)
+    process.start()
+    practicum_port, telegram_port = ready.get(timeout=10)
+    return (
+        process,
+        f'http://127.0.0.1:{practicum_port}',
+        f'http://127.0.0.1:{telegram_port}',
+    )
+
+
+def make_context(telegram_url, state_dir, args):
+    """Build the worker context the way main() does, pointed at fakes."""
+    bot = telegram.Bot(BOT_TOKEN, base_url=f'{telegram_url}/bot')
+    store = storage.open_store('sqlite', os.path.join(state_dir, 'state.db'))
+    context = homework.BotContext(bot, store)
+    context.scheduler = AdaptiveScheduler(
+        min_interval=args.interval, max_interval=args.interval, jitter=0
+    )
+    context.delivery = DeliveryQueue(
+        send=context.delivery.send, global_rate=args.telegram_rate
+    )
+    return context
+
+
+def drive_sync(context, registry, duration) -> int:
+    """Poll like run_sync() for `duration` seconds, return poll count."""
+    polls = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        due = context.scheduler.due(registry)
+        for subscription in due:
+            homework.poll_subscription(context, subscription)
+            polls += 1
+            if time.monotonic() >= deadline:
+                break
+        context.finish_cycle()
+        if not due:
+            time.sleep(0.01)
+    return polls
+
+
+def drive_threads(context, registry, duration) -> int:
+    """Poll like run_threads() for `duration` seconds, return poll count."""
+    polls = []
+
+    def poll(subscription):
+        homework.poll_subscription(context, subscription)
+        polls.append(1)
+
+    stopping = threading.Event()
+    timer = threading.Timer(duration, stopping.set)
+    timer.start()
+    ThreadPoller(
+        poll=poll,
+        scheduler=context.scheduler,
+        after_cycle=context.finish_cycle,
+        stopping=stopping,
+    ).run_forever(registry)
+    return len(polls)
+
+
+DRIVERS = {
+    'sync': drive_sync,
+    'threads': drive_threads,
+}
+
+
+def rss_bytes() -> int:
+    """Return the current resident set size of this process."""
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def run_level(count, args) -> dict:
+    """Benchmark one subscription count."""
+    process, practicum_url, telegram_url = start_servers(args)
+    homework.ENDPOINT = f'{practicum_url}/api/user_api/homework_statuses/'
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        subscription = registry.add(f'token{number}', number + 1)
+        subscription.current_date = int(time.time())
+    with tempfile.TemporaryDirectory() as state_dir:
+        context = make_context(telegram_url, state_dir, args)
+        context.start()
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        started = time.monotonic()
+        polls = DRIVERS[args.mode](context, registry, args.duration)
+        elapsed = time.monotonic() - started
+        after = resource.getrusage(resource.RUSAGE_SELF)
+        rss = rss_bytes()
+        context.delivery.stop(timeout=args.drain)
+        context.store.close()
+    with urllib.request.urlopen(f'{telegram_url}/stats') as response:
+        stats = json.load(response)
+    process.terminate()
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return {
+        'subscriptions': count,
+        'mode': args.mode,
+        'polls': polls,
+        'polls_per_second': polls / elapsed,
+        'notifications': stats['notifications'],
+        'p50_latency': stats['p50'],
+        'p99_latency': stats['p99'],
+        'cpu_percent': 100 * cpu / elapsed,
+        'rss_mb': rss / 2 ** 20,
+        'max_rss_mb': after.ru_maxrss / 2 ** 10,
+    }
+
+
+def format_row(result) -> str:
+    """Render one result as a table row."""
+    def seconds(value):
+        return '-' if value is None else f'{value:.3f}s'
+
+    return (
+        f"{result['subscriptions']:>8} {result['mode']:>6} "
+        f"{result['polls_per_second']:>10.1f} "
+        f"{seconds(result['p50_latency']):>9} "
+        f"{seconds(result['p99_latency']):>9} "
+        f"{result['cpu_percent']:>6.1f}% {result['rss_mb']:>8.1f}"
+    )
+
+
+def parse_args(argv=None):
+    """Read the command line."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument(
+        '--subscriptions', type=int, nargs='+', default=[1, 100, 10000]
+    )
+    parser.add_argument('--mode', choices=sorted(DRIVERS), default='sync')
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=0,
+                        help='poll interval per subscription, seconds')
+    parser.add_argument('--api-latency', type=float, default=0.0)
+    parser.add_argument('--api-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-latency', type=float, default=0.0)
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0)
+    parser.add_argument('--telegram-rate', type=float, default=25)
+    parser.add_argument('--change-interval', type=float, default=5.0)
+    parser.add_argument('--history-size', type=int, default=0,
+                        help='old homeworks in every answer')
+    parser.add_argument('--drain', type=float, default=5,
+                        help='seconds to wait for queued messages')
+    parser.add_argument('--json', help='also write results to this file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Run every level and print a table."""
+    args = parse_args(argv)
+    print(f"{'subs':>8} {'mode':>6} {'polls/s':>10} {'p50':>9} {'p99':>9} "
+          f"{'cpu':>7} {'rss, MB':>8}")
+    results = []
+    for count in args.subscriptions:
+        result = run_level(count, args)
+        results.append(result)
+        print(format_row(result), flush=True)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Fast-forward simulation of the poll loop on virtual time.
+
+Runs the real sync loop, scheduler, change detection and delivery for
+simulated days against a simulated Practicum API, and reports how many
+API calls a scheduling policy makes and how late it notices changes:
+
+    python benchmarks/simulate.py --subscriptions 1000 --days 7
+    python benchmarks/simulate.py --min-interval 30 --max-interval 300
+
+Runs with the same --seed give the same figures.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import homework  # noqa: E402
+import scheduler  # noqa: E402
+import storage  # noqa: E402
+from clock import SimulatedClock  # noqa: E402
+from simulation import DAY, SimulatedUpstream  # noqa: E402
+from subscriptions import SubscriptionRegistry  # noqa: E402
+
+START = 1_700_000_000
+
+
+def run(subscriptions, days, change_interval, homeworks, min_interval,
+        max_interval, jitter, seed) -> dict:
+    """Simulate one policy and return its figures."""
+    clock = SimulatedClock(START, until=START + days * DAY)
+    upstream = SimulatedUpstream(
+        clock, change_interval=change_interval, homeworks=homeworks,
+        seed=seed,
+    )
+    registry = SubscriptionRegistry()
+    for number in range(subscriptions):
+        registry.add(f'token-{number}', number)
+    policy = scheduler.AdaptiveScheduler(
+        min_interval=min_interval, max_interval=max_interval, jitter=jitter,
+        rng=random.Random(seed).random, clock=clock,
+    )
+    started = time.perf_counter()
+    homework.simulate(
+        registry, upstream, clock, storage.open_store('memory'), policy
+    )
+    result = upstream.stats(subscriptions)
+    result['wall_seconds'] = time.perf_counter() - started
+    return result
+
+
+def main(argv=None):
+    """Parse the policy and workload, simulate and print the figures."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscriptions', type=int, default=100)
+    parser.add_argument('--days', type=float, default=7)
+    parser.add_argument('--change-interval', type=float, default=DAY,
+                        help='mean seconds between status changes')
+    parser.add_argument('--homeworks', type=int, default=1)
+    parser.add_argument('--min-interval', type=float,
+                        default=scheduler.POLL_MIN_INTERVAL)
+    parser.add_argument('--max-interval', type=float,
+                        default=scheduler.POLL_MAX_INTERVAL)
+    parser.add_argument('--jitter', type=float, default=scheduler.POLL_JITTER)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args(argv)
+    result = run(
+        args.subscriptions, args.days, args.change_interval, args.homeworks,
+        args.min_interval, args.max_interval, args.jitter, args.seed,
+    )
+    for name, value in result.items():
+        print(f'{name:>28}: {value}')
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(result, file, indent=2)
+    return result
+
+
+if __name__ == '__main__':
+    main()
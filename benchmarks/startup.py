@@ -0,0 +1,114 @@
+"""Cold start benchmark: from `import homework` to the first finished poll.
+
+Every run is a fresh interpreter, the way a restarted dyno starts:
+
+    python benchmarks/startup.py --runs 5
+
+The fake Practicum API of fake_servers.py answers the poll, so the figure
+covers imports, building the context and one real HTTP round trip.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+HEAVY_MODULES = ('telegram', 'requests', 'asyncio', 'dotenv')
+
+
+def child(endpoint, state_path) -> dict:
+    """Import the bot, poll once and report timings; runs in a new process."""
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT_DIR)
+    import homework
+    imported = time.perf_counter()
+    heavy = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    import storage
+    from subscriptions import Subscription
+
+    homework.ENDPOINT = endpoint
+    context = homework.BotContext(
+        None, storage.open_store('sqlite', state_path)
+    )
+    subscription = Subscription('token', 1, current_date=int(time.time()))
+    response = homework.get_api_answer_for(subscription)
+    homework.build_notifications(context, subscription, response)
+    polled = time.perf_counter()
+    context.store.close()
+    return {
+        'import': imported - started,
+        'first_poll': polled - started,
+        'heavy_modules_at_import': heavy,
+    }
+
+
+def start_fake_api():
+    """Run the fake APIs in a child process and return it with the URL."""
+    from fake_servers import serve
+
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(ready,), daemon=True)
+    process.start()
+    practicum_port, _ = ready.get(timeout=10)
+    return process, (
+        f'http://127.0.0.1:{practicum_port}/api/user_api/homework_statuses/'
+    )
+
+
+def measure(endpoint, state_path) -> dict:
+    """Run one cold start in a fresh interpreter."""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', endpoint, state_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    result['process'] = time.perf_counter() - started
+    return result
+
+
+def main(argv=None):
+    """Measure several cold starts and print the medians."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--child', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return None
+    import tempfile
+
+    process, endpoint = start_fake_api()
+    try:
+        with tempfile.TemporaryDirectory() as state_dir:
+            results = [
+                measure(endpoint, os.path.join(state_dir, f'{run}.db'))
+                for run in range(args.runs)
+            ]
+    finally:
+        process.terminate()
+    summary = {
+        name: statistics.median(result[name] for result in results)
+        for name in ('import', 'first_poll', 'process')
+    }
+    summary['heavy_modules_at_import'] = results[0][
+        'heavy_modules_at_import'
+    ]
+    for name, value in summary.items():
+        print(f'{name:>24}: {value}')
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(summary, file, indent=2)
+    return summary
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, BENCHMARKS_DIR)
+    main()
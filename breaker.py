@@ -0,0 +1,111 @@
+"""Circuit breakers that stop calling an upstream while it is down."""
+import collections
+import os
+import threading
+import time
+
+import exceptions
+
+BREAKER_WINDOW = int(os.getenv('BREAKER_WINDOW', 20))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 10))
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+BREAKER_OPEN_TIME = float(os.getenv('BREAKER_OPEN_TIME', 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Closed, open and half-open states over a window of recent calls.
+
+    The breaker opens when at least `min_calls` of the last `window` calls
+    are known and the share of failures among them reaches
+    `failure_rate`. While open every call is refused at once with
+    CircuitOpen. Every `open_time` seconds a single probe call is let
+    through: its success closes the breaker, its failure opens it again.
+    `listener` is called with the breaker, the old and the new state on
+    every transition.
+    """
+
+    def __init__(self, name, window=BREAKER_WINDOW,
+                 min_calls=BREAKER_MIN_CALLS,
+                 failure_rate=BREAKER_FAILURE_RATE,
+                 open_time=BREAKER_OPEN_TIME, clock=time.monotonic,
+                 listener=None):
+        """Create a closed breaker for the upstream `name`."""
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_time = open_time
+        self.clock = clock
+        self.listener = listener
+        self.state = CLOSED
+        self._outcomes = collections.deque(maxlen=window)
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        old, self.state = self.state, state
+        if old != state and self.listener is not None:
+            self.listener(self, old, state)
+
+    def retry_after(self) -> float:
+        """Return seconds until the next probe may be attempted."""
+        return max(self._opened_at + self.open_time - self.clock(), 0)
+
+    def check(self):
+        """Raise CircuitOpen unless a call may go to the upstream now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_after = self.retry_after()
+            if not retry_after:
+                # One probe per `open_time`: a probe that never reports
+                # back does not keep the breaker half-open forever.
+                self._opened_at = self.clock()
+                self._set_state(HALF_OPEN)
+                return
+        raise exceptions.CircuitOpen(
+            f'Запросы к {self.name} приостановлены', retry_after
+        )
+
+    def record(self, success):
+        """Count the outcome of a call that passed `check()`."""
+        if success:
+            self.record_success()
+        else:
+            self.record_failure()
+
+    def record_success(self):
+        """Count a successful call; a successful probe closes the breaker."""
+        with self._lock:
+            self._outcomes.append(True)
+            if self.state == HALF_OPEN:
+                self._outcomes.clear()
+                self._set_state(CLOSED)
+
+    def record_failure(self):
+        """Count a failed call and open the breaker if there are too many."""
+        with self._lock:
+            self._outcomes.append(False)
+            if self.state == HALF_OPEN:
+                self._trip()
+            elif self.state == CLOSED and self._tripped():
+                self._trip()
+
+    def _tripped(self) -> bool:
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = calls - sum(self._outcomes)
+        return failures / calls >= self.failure_rate
+
+    def _trip(self):
+        self._opened_at = self.clock()
+        self._set_state(OPEN)
+
+    def value(self) -> int:
+        """Return the state as a number for the metrics endpoint."""
+        return STATE_VALUES[self.state]
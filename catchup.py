@@ -0,0 +1,126 @@
+"""Catch-up of subscriptions whose cursor fell behind while the bot was down.
+
+After a restart every subscription with an old persisted cursor is replayed
+in the background by a few low-priority threads, while live polling goes on
+for the others. A subscription joins live polling as soon as its catch-up
+is over, successful or not, so it is never polled twice at once.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+CATCHUP_AGE = int(os.getenv('CATCHUP_AGE', 10 * 60))
+CATCHUP_WORKERS = int(os.getenv('CATCHUP_WORKERS', 1))
+CATCHUP_QUEUE_LIMIT = int(os.getenv('CATCHUP_QUEUE_LIMIT', 100))
+BACKLOG_CHECK_INTERVAL = 0.5
+
+
+def is_behind(subscription, now=None, age=CATCHUP_AGE) -> bool:
+    """Tell whether the cursor of a subscription is older than `age`."""
+    now = time.time() if now is None else now
+    return bool(subscription.current_date) and (
+        now - subscription.current_date > age
+    )
+
+
+class LiveView:
+    """Subscriptions of a registry that are not being caught up."""
+
+    def __init__(self, registry, pending):
+        """Wrap `registry`, hiding the keys in `pending`."""
+        self._registry = registry
+        self._pending = pending
+
+    def __iter__(self):
+        """Iterate over the subscriptions polled live."""
+        pending = self._pending
+        return iter([
+            subscription for subscription in self._registry
+            if subscription.key not in pending
+        ])
+
+    def __len__(self):
+        """Return the number of subscriptions polled live."""
+        return len(self._registry) - len(self._pending)
+
+
+class CatchUp:
+    """Replays missed transitions without starving live polling.
+
+    `replay` handles one subscription from its cursor to now. Only
+    `workers` replays run at once, and none starts while `backlog()`, the
+    depth of the delivery queue, is above `queue_limit`, so live
+    notifications never wait behind a wall of summaries.
+    """
+
+    def __init__(self, replay, backlog=lambda: 0, stopping=None,
+                 workers=CATCHUP_WORKERS, queue_limit=CATCHUP_QUEUE_LIMIT,
+                 age=CATCHUP_AGE):
+        """Set up replays; nothing runs until `start()`."""
+        self.replay = replay
+        self.backlog = backlog
+        self.stopping = stopping or threading.Event()
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.age = age
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def live(self, registry) -> LiveView:
+        """Return the part of `registry` that live polling may touch."""
+        return LiveView(registry, self._pending)
+
+    def pending(self) -> int:
+        """Return how many subscriptions are still being caught up."""
+        return len(self._pending)
+
+    def start(self, subscriptions, now=None) -> int:
+        """Queue subscriptions that are behind, shortest gap first."""
+        behind = sorted(
+            (item for item in subscriptions
+             if is_behind(item, now, self.age)),
+            key=lambda item: -item.current_date,
+        )
+        if not behind:
+            return 0
+        logging.info('Догоняем пропущенное, подписок: %d', len(behind))
+        for subscription in behind:
+            self._pending.add(subscription.key)
+            self._queue.put(subscription)
+        for number in range(min(self.workers, len(behind))):
+            thread = threading.Thread(
+                target=self._run, name=f'catchup-{number}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        return len(behind)
+
+    def join(self, timeout=None):
+        """Wait for the catch-up threads to finish."""
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _wait_for_backlog(self) -> bool:
+        while self.backlog() > self.queue_limit:
+            if self.stopping.wait(BACKLOG_CHECK_INTERVAL):
+                return False
+        return not self.stopping.is_set()
+
+    def _run(self):
+        while True:
+            try:
+                subscription = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if self._wait_for_backlog():
+                    self.replay(subscription)
+            except Exception as error:
+                logging.error(
+                    'Не удалось догнать %s: %s', subscription.key, error
+                )
+            finally:
+                self._pending.discard(subscription.key)
@@ -0,0 +1,150 @@
+"""Per-homework change detection."""
+import threading
+from collections import namedtuple
+
+StatusChange = namedtuple(
+    'StatusChange', ['homework_id', 'homework', 'status', 'previous']
+)
+
+
+def homework_id_of(homework):
+    """Return the identifier a homework record is tracked by."""
+    if homework.id is not None:
+        return homework.id
+    return homework.homework_name
+
+
+class ChangeDetector:
+    """Compact map of homework id -> last delivered status per subscription.
+
+    Homeworks come in as schema.Homework records and only their interned
+    status is kept, so a tracked homework costs one dict slot. The map of
+    a subscription is seeded from the state store on first use and shared
+    with it. A change is committed only after it has been delivered.
+
+    Between `diff` and `commit` a change is pending: `diff` does not
+    report it again, so an answer pushed twice or a push overlapping a
+    poll of the same work is sent once. `release` gives up a pending
+    change that will not be delivered, so it is reported again.
+
+    The poll cursor of a subscription must not pass a change that is not
+    delivered yet: `hold_cursor` keeps it back while changes are pending
+    and `commit` hands it out once the last of them is delivered.
+    """
+
+    def __init__(self, store=None):
+        """Seed statuses from `store` lazily, if given."""
+        self.store = store
+        self._known = {}
+        self._pending = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    def known(self, key) -> dict:
+        """Return the last delivered statuses of a subscription."""
+        known = self._known.get(key)
+        if known is None:
+            known = self.store.statuses(key) if self.store else {}
+            self._known[key] = known
+        return known
+
+    def diff(self, key, homeworks) -> list:
+        """Return real status transitions, oldest first.
+
+        `homeworks` may be any iterable, e.g. records streamed from the
+        body: it is walked once and only the changes are kept. The API
+        lists the most recently updated works first, so the first record of
+        a homework wins and the changes are reversed at the end.
+        The changes returned are pending until committed or released; if
+        walking `homeworks` fails they are released at once.
+        """
+        known = self.known(key)
+        seen = set()
+        changes = []
+        try:
+            for homework in homeworks:
+                homework_id = homework_id_of(homework)
+                if homework_id in seen:
+                    continue
+                seen.add(homework_id)
+                status = homework.status
+                previous = known.get(homework_id)
+                if previous == status or not self._hold(key, homework):
+                    continue
+                changes.append(
+                    StatusChange(homework_id, homework, status, previous)
+                )
+        except BaseException:
+            for change in changes:
+                self.release(key, change.homework)
+            raise
+        changes.reverse()
+        return changes
+
+    def _hold(self, key, homework) -> bool:
+        """Mark a change pending; False if it already is."""
+        homework_id = homework_id_of(homework)
+        with self._lock:
+            pending = self._pending.setdefault(key, {})
+            if pending.get(homework_id) == homework.status:
+                return False
+            pending[homework_id] = homework.status
+            return True
+
+    def _discard(self, key, homework):
+        pending = self._pending.get(key)
+        if pending is None:
+            return
+        homework_id = homework_id_of(homework)
+        if pending.get(homework_id) == homework.status:
+            del pending[homework_id]
+        if not pending:
+            del self._pending[key]
+
+    def pending(self, key) -> int:
+        """Return the number of changes found but not yet delivered."""
+        with self._lock:
+            return len(self._pending.get(key, ()))
+
+    def release(self, key, homework):
+        """Give up a pending change, so the next `diff` reports it again.
+
+        A cursor held back for the subscription is dropped: it would skip
+        the change that was given up.
+        """
+        with self._lock:
+            self._discard(key, homework)
+            self._cursors.pop(key, None)
+
+    def hold_cursor(self, key, cursor) -> bool:
+        """Return True if `cursor` may be saved now.
+
+        Otherwise it is kept until the pending changes are committed.
+        """
+        with self._lock:
+            if key in self._pending:
+                self._cursors[key] = cursor
+                return False
+            self._cursors.pop(key, None)
+            return True
+
+    def commit(self, key, homework):
+        """Remember the delivered status of a homework record.
+
+        Returns the cursor held back for the subscription once nothing is
+        pending any more, otherwise None.
+        """
+        homework_id = homework_id_of(homework)
+        if self.store is None:
+            self.known(key)[homework_id] = homework.status
+        else:
+            # The map is the store's own: let it update it under its lock.
+            self.store.save_status(
+                key, homework_id, homework.status, homework.date_updated
+            )
+        # Known before it stops being pending, so `diff` never sees neither.
+        with self._lock:
+            self._discard(key, homework)
+            if key in self._pending:
+                return None
+            return self._cursors.pop(key, None)
@@ -0,0 +1,57 @@
+"""Wall-clock time for the poll loop: the real one or a simulated one.
+
+A clock is called for the current Unix time, and `wait(event, timeout)`
+pauses like `event.wait(timeout)`: it returns early, with True, once the
+event is set.
+"""
+import math
+import time
+
+
+class SystemClock:
+    """Real time; waiting blocks the calling thread."""
+
+    def __call__(self) -> float:
+        """Return the current Unix time."""
+        return time.time()
+
+    def wait(self, event, timeout) -> bool:
+        """Block until `timeout` passes or `event` is set."""
+        return event.wait(timeout)
+
+
+class SimulatedClock:
+    """Virtual time that jumps over every wait at once.
+
+    Days of polling run in the time the polls themselves take. Only the
+    thread driving the loop should wait on it. With `until` the wait that
+    reaches that moment sets the event, which ends the loop. Waits end on
+    a multiple of `resolution` seconds, so polls planned within the same
+    tick run in one cycle; the API counts time in whole seconds anyway.
+    """
+
+    def __init__(self, start=0.0, until=None, resolution=1.0):
+        """Start at `start` seconds and end the run at `until`."""
+        self.now = float(start)
+        self.until = until
+        self.resolution = resolution
+
+    def __call__(self) -> float:
+        """Return the simulated Unix time."""
+        return self.now
+
+    def advance(self, seconds):
+        """Move time forward."""
+        self.now += max(seconds, 0)
+
+    def wait(self, event, timeout) -> bool:
+        """Jump to the end of the wait, or to `until` and stop there."""
+        if not event.is_set():
+            moment = self.now + max(timeout, 0)
+            if self.resolution:
+                moment = math.ceil(moment / self.resolution) * self.resolution
+            self.now = max(moment, self.now)
+            if self.until is not None and self.now >= self.until:
+                self.now = self.until
+                event.set()
+        return event.is_set()
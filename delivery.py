@@ -0,0 +1,260 @@
+"""Outbound Telegram queue with rate limits, coalescing and dedupe."""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import exceptions
+
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 25))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+ERROR_DEDUPE_WINDOW = float(os.getenv('ERROR_DEDUPE_WINDOW', 600))
+DELIVERY_STOP_TIMEOUT = float(os.getenv('DELIVERY_STOP_TIMEOUT', 10))
+MAX_SEND_ATTEMPTS = 3
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = '\n\n'
+
+
+class TokenBucket:
+    """Allows `rate` events per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        """Start with a full bucket."""
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.not_before = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Return seconds until a token is available."""
+        now = self.clock()
+        self._refill(now)
+        wait = max(self.not_before - now, 0)
+        if self.tokens < 1:
+            wait = max(wait, (1 - self.tokens) / self.rate)
+        return wait
+
+    def consume(self):
+        """Take a token; call only after `delay()` returned zero."""
+        self.tokens -= 1
+
+    def pause(self, seconds):
+        """Hold the bucket for a while, e.g. after a 429."""
+        self.not_before = max(self.not_before, self.clock() + seconds)
+
+
+def coalesce(texts) -> list:
+    """Join texts for one chat into as few messages as Telegram allows."""
+    messages = []
+    for text in texts:
+        if messages and (
+            len(messages[-1]) + len(MESSAGE_SEPARATOR) + len(text)
+            <= MAX_MESSAGE_LENGTH
+        ):
+            messages[-1] += MESSAGE_SEPARATOR + text
+        else:
+            messages.append(text)
+    return messages
+
+
+class DeliveryQueue:
+    """Sends messages from a background thread so polling never waits.
+
+    Messages queued for one chat while it is rate limited are sent together
+    as a single message. Error notifications of the same kind are sent to
+    a chat at most once per `error_window` seconds. A failed send that
+    carries `retry_after` (Telegram flood control) is retried after that
+    pause; other failures are retried up to `MAX_SEND_ATTEMPTS` times,
+    then the message is given up and its `on_failed` is called with the
+    error. A permanent error, e.g. a chat that blocked the bot, gives the
+    message up at once.
+    """
+
+    def __init__(self, send, global_rate=TELEGRAM_GLOBAL_RATE,
+                 chat_rate=TELEGRAM_CHAT_RATE,
+                 error_window=ERROR_DEDUPE_WINDOW, clock=time.monotonic):
+        """Queue messages for `send(chat_id, text)`."""
+        self.send = send
+        self.chat_rate = chat_rate
+        self.error_window = error_window
+        self.clock = clock
+        self._global = TokenBucket(global_rate, clock=clock)
+        self._chats = {}
+        self._pending = OrderedDict()
+        self._recent_errors = {}
+        self._pruned_at = clock()
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._abandoned = False
+        self._thread = None
+
+    def start(self):
+        """Start the sender thread."""
+        self._thread = threading.Thread(
+            target=self._run, name='delivery', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=DELIVERY_STOP_TIMEOUT):
+        """Send what is already queued within `timeout` and stop the thread.
+
+        Messages still queued by then, e.g. while Telegram is down, are
+        given up: a SIGTERM must not wait for the end of an outage.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is None:
+            return
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            return
+        with self._condition:
+            left = sum(len(batch) for batch in self._pending.values())
+            self._pending.clear()
+            self._abandoned = True
+            self._condition.notify()
+        logging.warning('Остановка без отправки сообщений: %d', left)
+
+    def flush(self):
+        """Send everything queued from the calling thread, without waits.
+
+        For use without the sender thread, e.g. to replay recorded traffic
+        one poll at a time. Failed sends get `MAX_SEND_ATTEMPTS` passes.
+        """
+        for _ in range(MAX_SEND_ATTEMPTS):
+            with self._condition:
+                batches = list(self._pending.items())
+                self._pending.clear()
+            if not batches:
+                return
+            for chat_id, batch in batches:
+                self._send_batch(chat_id, batch)
+
+    def put(self, chat_id, text, on_sent=None, on_failed=None):
+        """Queue a message.
+
+        `on_sent` is called once it is delivered, `on_failed` with the
+        last error if it is given up.
+        """
+        with self._condition:
+            self._pending.setdefault(chat_id, []).append(
+                [text, on_sent, on_failed, 0]
+            )
+            self._condition.notify()
+
+    def put_error(self, chat_id, text, kind=None) -> bool:
+        """Queue an error message unless one of its kind was sent recently.
+
+        `kind` tells which messages are the same error, e.g. the error
+        class: texts often embed details that differ on every attempt. By
+        default the text itself is the kind.
+        """
+        now = self.clock()
+        key = (chat_id, text if kind is None else kind)
+        with self._condition:
+            self._prune_errors(now)
+            sent_at = self._recent_errors.get(key)
+            if sent_at is not None and now - sent_at < self.error_window:
+                return False
+            self._recent_errors[key] = now
+        self.put(chat_id, text)
+        return True
+
+    def _prune_errors(self, now):
+        """Forget errors sent before the window, once per window."""
+        if now - self._pruned_at < self.error_window:
+            return
+        self._recent_errors = {
+            key: sent_at for key, sent_at in self._recent_errors.items()
+            if now - sent_at < self.error_window
+        }
+        self._pruned_at = now
+
+    def qsize(self) -> int:
+        """Return the number of queued messages."""
+        with self._condition:
+            return sum(len(batch) for batch in self._pending.values())
+
+    def _bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, clock=self.clock)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def _take_ready(self):
+        """Return (chat_id, batch) allowed to go now or (None, wait)."""
+        wait = self._global.delay()
+        if wait:
+            return None, wait
+        for chat_id in self._pending:
+            bucket = self._bucket(chat_id)
+            chat_wait = bucket.delay()
+            if not chat_wait:
+                self._global.consume()
+                bucket.consume()
+                return chat_id, self._pending.pop(chat_id)
+            wait = chat_wait if not wait else min(wait, chat_wait)
+        return None, wait
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+                chat_id, batch = self._take_ready()
+                if chat_id is None:
+                    self._condition.wait(batch)
+                    continue
+            self._send_batch(chat_id, batch)
+
+    def _send_batch(self, chat_id, batch):
+        texts = [entry[0] for entry in batch]
+        try:
+            for text in coalesce(texts):
+                self.send(chat_id, text)
+        except Exception as error:
+            self._retry(chat_id, batch, error)
+            return
+        for _, on_sent, _, _ in batch:
+            if on_sent is not None:
+                on_sent()
+
+    def _give_up(self, batch, error) -> list:
+        """Count a failed attempt; return the entries worth another one."""
+        permanent = isinstance(error, exceptions.PermanentError)
+        for entry in batch:
+            entry[3] = MAX_SEND_ATTEMPTS if permanent else entry[3] + 1
+        given_up = [entry for entry in batch if entry[3] >= MAX_SEND_ATTEMPTS]
+        for _, _, on_failed, _ in given_up:
+            if on_failed is not None:
+                on_failed(error)
+        if given_up:
+            logging.error('Не удалось отправить сообщение: %s', error)
+        return [entry for entry in batch if entry[3] < MAX_SEND_ATTEMPTS]
+
+    def _retry(self, chat_id, batch, error):
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is None:
+            batch = self._give_up(batch, error)
+            if not batch:
+                return
+        with self._condition:
+            if self._abandoned:
+                return
+            self._bucket(chat_id).pause(retry_after or 1)
+            self._pending[chat_id] = batch + self._pending.get(chat_id, [])
+            self._pending.move_to_end(chat_id, last=False)
+        logging.warning('Отправка в чат отложена: %s', error)
@@ -1,7 +1,85 @@
-"""Exceptions of Yandex API Homework bot."""
+"""Exceptions of Yandex API Homework bot.
+
+The scheduler decides how soon to poll again by the class of the error:
+transient errors back off exponentially, those with `retry_after` wait
+as long as the server asked, permanent ones are polled at the slowest
+pace and a revoked token suspends its subscription.
+"""
 
 
 class SomethingWentWrong(Exception):
     """Houston, we have a problem."""
 
     pass
+
+
+class TransientError(SomethingWentWrong):
+    """A later attempt may well succeed."""
+
+    retry_after = None
+
+
+class TransientNetworkError(TransientError):
+    """Connection failure, timeout or a 5xx answer."""
+
+    pass
+
+
+class RateLimited(TransientError):
+    """The API asked us to slow down."""
+
+    def __init__(self, message, retry_after=None):
+        """Keep the pause the API asked for, in seconds."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpen(TransientError):
+    """The upstream is considered down, the call was not made."""
+
+    def __init__(self, message, retry_after=None):
+        """Keep the time left until the breaker lets a probe."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PermanentError(SomethingWentWrong):
+    """Retrying soon will give the same result."""
+
+    pass
+
+
+class AuthRevoked(PermanentError):
+    """The Practicum token was rejected; its subscription is suspended."""
+
+    pass
+
+
+class ChatUnavailable(PermanentError):
+    """Telegram refused the chat: the bot was blocked or the chat is gone."""
+
+    pass
+
+
+class MalformedPayload(PermanentError):
+    """The API answer does not match the documented format."""
+
+    __str__ = Exception.__str__
+
+
+class UnexpectedType(MalformedPayload, TypeError):
+    """A field of the answer, or the answer itself, has a wrong type."""
+
+    pass
+
+
+class MissingField(MalformedPayload, KeyError):
+    """A required field is absent from the answer."""
+
+    pass
+
+
+class UnknownStatus(PermanentError, KeyError):
+    """A homework has a status we have no message for."""
+
+    __str__ = Exception.__str__
@@ -1,86 +1,264 @@
-"""Homework API Telegram-bot."""
-import telegram
+"""Homework API Telegram-bot.
+
+Only what the first poll needs is imported here. python-telegram-bot,
+requests and the process supervisor are imported by the code that uses
+them. Run as a script, the bot reads `.env` first of all: the
+modules below take their settings from the environment when imported.
+"""
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+import functools
+import heapq
 import exceptions
 import time
 import logging
 import os
+import random
+import signal
 import sys
-import requests
-from dotenv import load_dotenv
+import threading
+import storage
+from collections import namedtuple
 from http import HTTPStatus
-
-load_dotenv()
+import metrics
+from breaker import CircuitBreaker, OPEN, CLOSED
+from catchup import CatchUp
+from clock import SystemClock
+from changes import ChangeDetector
+from delivery import (
+    TELEGRAM_CHAT_RATE, TELEGRAM_GLOBAL_RATE, DeliveryQueue, coalesce
+)
+from response_cache import CachedAnswer, ResponseCache, fresh_homeworks
+from http_client import get_client
+import ingest
+import logs
+import profiling
+import traffic
+from scheduler import AdaptiveScheduler, parse_retry_after
+from schema import iter_homeworks, validate_envelope, validate_homework
+from sharding import select_shard, shard_from_env, worker_shard
+from streaming_json import StreamedAnswer
+from subscriptions import Subscription, SubscriptionRegistry
+from templates import Templates
 
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+SUBSCRIPTIONS_FILE = os.getenv('SUBSCRIPTIONS_FILE')
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 RETRY_TIME = 6
+POLL_MODE = os.getenv('POLL_MODE', 'sync')
+METRICS_PORT = os.getenv('METRICS_PORT')
+WORKERS = int(os.getenv('WORKERS', 1))
+METRICS_DUMP = os.getenv('METRICS_DUMP')
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
-HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+STREAMING_AGE = int(os.getenv('STREAMING_AGE', 7 * 24 * 60 * 60))
+RATE_LIMIT_CODES = (
+    HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.SERVICE_UNAVAILABLE
+)
+AUTH_FAILURE_CODES = (HTTPStatus.UNAUTHORIZED, HTTPStatus.FORBIDDEN)
 
 
-HOMEWORK_VERDICTS = {
-    'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
-    'reviewing': 'Работа взята на проверку ревьюером.',
-    'rejected': 'Работа проверена: у ревьюера есть замечания.'
-}
+CLOCK = SystemClock()
+RESPONSE_CACHE = ResponseCache()
+PRACTICUM_BREAKER = CircuitBreaker('Practicum API')
+TELEGRAM_BREAKER = CircuitBreaker('Telegram API')
+
+API_LATENCY = metrics.REGISTRY.histogram(
+    'homework_api_request_seconds', 'Practicum API request latency.'
+)
+TELEGRAM_LATENCY = metrics.REGISTRY.histogram(
+    'homework_telegram_send_seconds', 'Telegram send latency.'
+)
+STEP_LATENCY = metrics.REGISTRY.histogram(
+    'homework_step_seconds', 'Time spent in a pipeline step.', ['step'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1),
+)
+CYCLE_PERIOD = metrics.REGISTRY.histogram(
+    'homework_poll_cycle_seconds', 'Real period of the poll loop.'
+)
+POLLS = metrics.REGISTRY.counter(
+    'homework_polls_total', 'Polls by subscription and result.',
+    ['subscription', 'result'],
+)
+ERRORS = metrics.REGISTRY.counter(
+    'homework_poll_errors_total', 'Failed polls by exception type.', ['type']
+)
+LAST_SUCCESS = metrics.REGISTRY.gauge(
+    'homework_last_success_timestamp_seconds',
+    'Time of the last successful poll.', ['subscription'],
+)
+BREAKER_STATE = metrics.REGISTRY.gauge(
+    'homework_circuit_breaker_state',
+    'Breaker state: 0 closed, 1 half-open, 2 open.', ['upstream'],
+)
+for cache_result in ('hits', 'misses', 'revalidated'):
+    metrics.REGISTRY.gauge(
+        f'homework_response_cache_{cache_result}',
+        f'Response cache {cache_result}.',
+        function=lambda name=cache_result: RESPONSE_CACHE.stats()[name],
+    )
+
+
+TEMPLATES = Templates.load()
+HOMEWORK_VERDICTS = TEMPLATES.verdicts()
+
+Notification = namedtuple('Notification', ['text', 'homework'])
+
+
+@profiling.timed('send_message')
+@TELEGRAM_LATENCY.time()
+def send_to_chat(bot, chat_id, message):
+    """Send a status to the given chat."""
+    TELEGRAM_BREAKER.check()
+    started = time.perf_counter()
+    try:
+        bot.send_message(
+            chat_id=chat_id,
+            text=message
+        )
+    except Exception as err:
+        traffic.record_send(
+            chat_id, message, time.perf_counter() - started, err
+        )
+        # Only network failures say Telegram is down; a rejected message
+        # or a flood wait come from a working API.
+        from telegram.error import BadRequest, NetworkError, Unauthorized
+
+        TELEGRAM_BREAKER.record(
+            not isinstance(err, NetworkError) or isinstance(err, BadRequest)
+        )
+        # A blocked bot or a missing chat will refuse every resend.
+        if isinstance(err, (BadRequest, Unauthorized)):
+            raise exceptions.ChatUnavailable(str(err)) from err
+        raise
+    traffic.record_send(chat_id, message, time.perf_counter() - started)
+    TELEGRAM_BREAKER.record_success()
 
 
 def send_message(bot, message):
     """Send a status."""
-    bot.send_message(
-        chat_id=TELEGRAM_CHAT_ID,
-        text=message
-    )
+    send_to_chat(bot, TELEGRAM_CHAT_ID, message)
 
 
-def get_api_answer(current_timestamp) -> dict:
-    """Get a response from the request."""
-    timestamp = current_timestamp or int(time.time())
+def raise_for_status(response):
+    """Turn an unsuccessful answer into the matching exception."""
+    if response.status_code in RATE_LIMIT_CODES:
+        raise exceptions.RateLimited(
+            f'API ограничивает запросы: {response.status_code}',
+            parse_retry_after(
+                getattr(response, 'headers', {}).get('Retry-After')
+            ),
+        )
+    if response.status_code in AUTH_FAILURE_CODES:
+        raise exceptions.AuthRevoked(
+            f'Токен отклонён API: {response.status_code}'
+        )
+    if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        raise exceptions.TransientNetworkError(
+            f'Ресурс недоступен: {response.status_code}'
+        )
+    if response.status_code != HTTPStatus.OK:
+        raise exceptions.SomethingWentWrong('Ресурс недоступен')
+
+
+@profiling.timed('get_api_answer')
+@API_LATENCY.time()
+def request_homeworks(token, current_timestamp, cache_key=None) -> dict:
+    """Get a response from the request made with the given token.
+
+    Answers are compared with the previous one under `cache_key`, the
+    token unless a subscription key is given.
+    """
+    cache_key = cache_key or token
+    timestamp = current_timestamp or int(CLOCK())
     logging.info('Начат запрос к API.')
+    headers = {'Authorization': f'OAuth {token}'}
+    headers.update(
+        RESPONSE_CACHE.conditional_headers(cache_key, timestamp)
+    )
     data = {
-        'headers': HEADERS,
+        'headers': headers,
         'params': {'from_date': timestamp}
     }
+    streaming = CLOCK() - timestamp > STREAMING_AGE
+    PRACTICUM_BREAKER.check()
     try:
-        response = requests.get(ENDPOINT, **data)
-    except requests.ConnectionError as err:
-        raise exceptions.SomethingWentWrong(
-            f'Ошибка соединения: {err}') from err
-    if response.status_code != HTTPStatus.OK:
-        raise exceptions.SomethingWentWrong('Ресурс недоступен')
-    return response.json()
+        response = get_client().get(ENDPOINT, stream=streaming, **data)
+    except exceptions.TransientNetworkError:
+        PRACTICUM_BREAKER.record_failure()
+        raise
+    PRACTICUM_BREAKER.record(
+        response.status_code < HTTPStatus.INTERNAL_SERVER_ERROR
+        and response.status_code not in RATE_LIMIT_CODES
+    )
+    if streaming and response.status_code != HTTPStatus.OK:
+        response.close()
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        return RESPONSE_CACHE.not_modified(cache_key, timestamp)
+    raise_for_status(response)
+    if streaming:
+        return StreamedAnswer(response)
+    try:
+        return RESPONSE_CACHE.decode(cache_key, timestamp, response)
+    except ValueError as err:
+        raise exceptions.MalformedPayload(
+            f'Ответ API не является JSON: {err}'
+        ) from err
+
+
+def get_api_answer(current_timestamp) -> dict:
+    """Get a response from the request."""
+    return request_homeworks(PRACTICUM_TOKEN, current_timestamp)
+
+
+def get_api_answer_for(subscription) -> dict:
+    """Get a response for the subscription from its cursor."""
+    from_date = subscription.current_date
+    try:
+        answer = request_homeworks(
+            subscription.token, from_date, subscription.key
+        )
+    except Exception as error:
+        traffic.record_error(subscription, error)
+        raise
+    traffic.record_answer(subscription, from_date, answer)
+    return answer
 
 
+@profiling.timed('check_response')
+@STEP_LATENCY.time('check_response')
 def check_response(response) -> list:
-    """Check if response is correct."""
-    type_is_correct = isinstance(response, dict)
-    dict_is_not_empty = True
+    """Check the envelope of the answer and return its homeworks."""
+    if not isinstance(response, dict):
+        raise exceptions.UnexpectedType('Ответ не является словарём.')
     if not response:
-        dict_is_not_empty = False
-    homeworks_is_list = isinstance(response['homeworks'], list)
+        raise exceptions.MalformedPayload('Словарь пуст.')
+    return validate_envelope(response).homeworks
+
 
-    if not type_is_correct:
-        raise exceptions.SomethingWentWrong('Ответ не является словарём.')
-    if not dict_is_not_empty:
-        raise exceptions.SomethingWentWrong('Словарь пуст.')
-    if not homeworks_is_list:
-        raise exceptions.SomethingWentWrong('Нет списка домашних работ.')
-    return response['homeworks']
+@STEP_LATENCY.time('validate')
+def parse_homeworks(homeworks) -> list:
+    """Validate every homework of the answer and return the records."""
+    return list(iter_homeworks(homeworks))
+
+
+@profiling.timed('parse_status')
+@STEP_LATENCY.time('parse_status')
+def render_homework(homework, locale=None) -> str:
+    """Render the status message of a Homework record in a locale."""
+    return TEMPLATES.render_status(
+        homework.homework_name, homework.status, locale
+    )
 
 
 def parse_status(homework) -> str:
     """Parse the last homework and return its status to send to Telegram."""
-    try:
-        homework_name = homework['homework_name']
-        homework_status = homework['status']
-    except KeyError as err:
-        raise KeyError(f'Ошибка в поиске значения: {err}')
-    else:
-        verdict = HOMEWORK_VERDICTS[homework_status]
-        return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return render_homework(validate_homework(homework))
 
 
 def check_tokens() -> bool:
@@ -89,61 +267,663 @@ def check_tokens() -> bool:
     return all(TOKENS)
 
 
-def main():
-    """Run the main logic."""
-    if check_tokens:
-        bot = telegram.Bot(token=TELEGRAM_TOKEN)
+def load_subscriptions() -> SubscriptionRegistry:
+    """Collect subscriptions from the file and the environment."""
+    registry = SubscriptionRegistry()
+    if SUBSCRIPTIONS_FILE:
+        registry.load(SUBSCRIPTIONS_FILE)
+    if PRACTICUM_TOKEN and TELEGRAM_CHAT_ID:
+        registry.add(PRACTICUM_TOKEN, TELEGRAM_CHAT_ID)
+    return registry
+
+
+def make_bot():
+    """Build the Telegram client, importing python-telegram-bot."""
+    import telegram
+
+    return telegram.Bot(token=TELEGRAM_TOKEN)
+
+
+class BotContext:
+    """Collaborators shared by every poll of a worker.
+
+    Without a `bot` one is built on the first send, off the poll path.
+    The poll loop reads time from `clock`, the real one by default.
+    """
+
+    def __init__(self, bot, store, clock=None):
+        """Bind the bot and the state store of a worker."""
+        self._bot = bot
+        self.store = store
+        self.clock = clock or CLOCK
+        self.detector = ChangeDetector(store)
+        self.scheduler = AdaptiveScheduler(clock=self.clock)
+        self.delivery = DeliveryQueue(send=self.send)
+        self.cycle_started = None
+        self.stopping = threading.Event()
+
+    @property
+    def bot(self):
+        """Return the Telegram client, building it on first use."""
+        if self._bot is None:
+            self._bot = make_bot()
+        return self._bot
+
+    def send(self, chat_id, message):
+        """Send a message with the worker's bot."""
+        send_to_chat(self.bot, chat_id, message)
+
+    def start(self, metrics_port=None):
+        """Start background delivery and the metrics endpoint."""
+        self.delivery.start()
+        for breaker in (PRACTICUM_BREAKER, TELEGRAM_BREAKER):
+            breaker.listener = self.breaker_changed
+            BREAKER_STATE.set(breaker.value(), breaker.name)
+        metrics.REGISTRY.gauge(
+            'homework_delivery_queue_depth', 'Messages waiting to be sent.',
+            function=self.delivery.qsize,
+        )
+        metrics.REGISTRY.gauge(
+            'homework_oldest_success_age_seconds',
+            'Age of the least recent successful poll among subscriptions.',
+            function=self.oldest_success_age,
+        )
+        if metrics_port:
+            metrics.serve(
+                metrics_port, actions=profiling.ADMIN_ACTIONS,
+                secret=profiling.PROFILE_SECRET,
+            )
+
+    def oldest_success_age(self) -> float:
+        """Return how long ago the least recent polled subscription succeeded.
+
+        Suspended subscriptions are left out: they are not polled, so their
+        age would only grow and hide the ones that really fall behind.
+        """
+        now = self.clock()
+        return now - min((
+            succeeded_at
+            for (key,), succeeded_at in LAST_SUCCESS.values().items()
+            if not self.scheduler.suspended(key)
+        ), default=now)
+
+    def stop(self, *args):
+        """Ask the poll loop to finish, e.g. on SIGTERM from Heroku."""
+        logging.info('Получен сигнал остановки')
+        self.stopping.set()
+
+    def breaker_changed(self, breaker, old, new):
+        """Send one alert for an upstream outage instead of one per poll."""
+        BREAKER_STATE.set(breaker.value(), breaker.name)
+        if new == OPEN and old == CLOSED:
+            template = 'upstream_down'
+        elif new == CLOSED:
+            template = 'upstream_up'
+        else:
+            return
+        message = TEMPLATES.text(template, upstream=breaker.name)
+        logging.critical(message)
+        if TELEGRAM_CHAT_ID and breaker is not TELEGRAM_BREAKER:
+            self.delivery.put_error(TELEGRAM_CHAT_ID, message)
+
+    def finish_cycle(self):
+        """Save the state and measure the loop period."""
+        self.store.flush()
+        now = time.monotonic()
+        if self.cycle_started is not None:
+            CYCLE_PERIOD.observe(now - self.cycle_started)
+        self.cycle_started = now
+
+    def close(self):
+        """Deliver queued messages for a while and save the state.
+
+        The state is saved even if the queue did not drain: a cursor never
+        passes an unsent change, so those are found again after a restart.
+        """
+        try:
+            self.delivery.stop()
+        finally:
+            self.store.close()
+            if METRICS_DUMP:
+                metrics.REGISTRY.dump(METRICS_DUMP)
+
+
+def log_fields(subscription) -> dict:
+    """Return the `extra` that ties a log record to a subscription."""
+    return {
+        'subscription': subscription.key, 'chat_id': subscription.chat_id
+    }
+
+
+def release_changes(context, subscription, changes):
+    """Give up changes that will not be delivered from this answer."""
+    for change in changes:
+        context.detector.release(subscription.key, change.homework)
+
+
+def release_unsent(context, subscription, homework):
+    """Give up a change whose message failed, so the next poll finds it.
+
+    The cursor stayed behind the change, but the next answer will likely
+    equal the last one: the cached digest is dropped too, or that answer
+    would be taken as unchanged and skip change detection.
+    """
+    context.detector.release(subscription.key, homework)
+    RESPONSE_CACHE.forget(subscription.key)
+
+
+def consume_stream(context, subscription, response) -> tuple:
+    """Feed a streamed answer into change detection record by record.
+
+    Returns the changes and the number of records in the answer, which
+    are not kept themselves.
+    """
+    records = 0
+
+    def counted(homeworks):
+        nonlocal records
+        for homework in homeworks:
+            records += 1
+            yield homework
+
+    changes = context.detector.diff(
+        subscription.key, counted(iter_homeworks(response.iter_homeworks()))
+    )
+    try:
+        check_response(response)
+    except exceptions.SomethingWentWrong:
+        release_changes(context, subscription, changes)
+        raise
+    response['homeworks'] = [change.homework for change in changes]
+    return changes, records
+
+
+def detect_changes(context, subscription, response) -> tuple:
+    """Validate an answer; return its changes and if it listed any work."""
+    if isinstance(response, StreamedAnswer):
+        changes, records = consume_stream(context, subscription, response)
+        return changes, records > 0
+    check_response(response)
+    if getattr(response, 'unchanged', False):
+        return [], True
+    response['homeworks'] = parse_homeworks(response['homeworks'])
+    return (
+        context.detector.diff(subscription.key, response['homeworks']),
+        bool(response['homeworks']),
+    )
+
+
+def render_changes(context, subscription, changes) -> list:
+    """Render a notification for every change one by one.
+
+    A change with a status we have no message for is reported and given
+    up; the others in the same answer are still delivered.
+    """
+    notifications = []
+    for change in changes:
+        try:
+            text = render_homework(change.homework, subscription.locale)
+        except exceptions.UnknownStatus as error:
+            context.detector.release(subscription.key, change.homework)
+            notify_failure(context, subscription, error)
+            continue
+        notifications.append(Notification(text, change.homework))
+    return notifications
+
+
+def advance_cursor(context, subscription, current_date):
+    """Move the poll cursor of a subscription and save it."""
+    subscription.current_date = current_date
+    context.store.save_cursor(subscription.key, current_date)
+
+
+def build_notifications(context, subscription, response) -> list:
+    """Return one notification per real status transition in the response.
+
+    The cursor moves to the `current_date` of the answer at once only if
+    no change is waiting to be sent. Otherwise it is moved by
+    `commit_change` when the last one is delivered, so neither a failed
+    send nor a crash before the send lets the next poll skip a change.
+    'Нет домашних работ' is sent only on the very first poll of a
+    subscription, the one before any cursor was saved, so restarts and
+    deploys do not repeat it.
+    """
+    changes, listed = detect_changes(context, subscription, response)
+    notifications = render_changes(context, subscription, changes)
+    first_poll = context.store.load_cursor(subscription.key) is None
+    current_date = response['current_date']
+    if context.detector.hold_cursor(subscription.key, current_date):
+        advance_cursor(context, subscription, current_date)
+    POLLS.inc(subscription.key, 'ok')
+    LAST_SUCCESS.set(context.clock(), subscription.key)
+    if getattr(response, 'unchanged', False):
+        logging.debug(
+            'Ответ API не изменился', extra=log_fields(subscription)
+        )
+        return []
+    if not listed:
+        message = TEMPLATES.text('no_homeworks', subscription.locale)
+        logging.info(message, extra=log_fields(subscription))
+        if subscription.last_message or not first_poll:
+            return []
+        return [Notification(message, None)]
+    if not notifications:
+        logging.debug(
+            'Новые сообщения отсутствуют', extra=log_fields(subscription)
+        )
+    return notifications
+
+
+def commit_change(context, subscription, homework):
+    """Remember a delivered status and move a cursor it was holding back."""
+    cursor = context.detector.commit(subscription.key, homework)
+    if cursor is not None:
+        advance_cursor(context, subscription, cursor)
+
+
+def drop_unsent(context, subscription, homeworks, error):
+    """Give up changes whose message the queue could not send.
+
+    After a transient error the changes are released for the next poll to
+    find. A chat Telegram refuses would refuse every resend as well: the
+    changes are remembered as if delivered and the cursor moves on.
+    """
+    permanent = isinstance(error, exceptions.PermanentError)
+    if permanent:
+        logging.error(
+            'Чат недоступен, изменения пропущены: %s', error,
+            extra=log_fields(subscription),
+        )
+    for homework in homeworks:
+        if permanent:
+            commit_change(context, subscription, homework)
+        else:
+            release_unsent(context, subscription, homework)
+
+
+def deliver(context, subscription, notification):
+    """Queue a notification and remember it once it is sent.
+
+    A notification given up by the queue after transient errors releases
+    its change: the cursor stayed behind it, so the next poll finds the
+    change again.
+    """
+    def on_sent():
+        if notification.homework is not None:
+            commit_change(context, subscription, notification.homework)
+        logging.info(
+            'Успешно отправлено сообщение "%s"', notification.text,
+            extra=log_fields(subscription),
+        )
+
+    def on_failed(error):
+        if notification.homework is not None:
+            drop_unsent(
+                context, subscription, [notification.homework], error
+            )
+
+    subscription.last_message = notification.text
+    context.delivery.put(
+        subscription.chat_id, notification.text, on_sent, on_failed
+    )
+
+
+def deliver_summary(context, subscription, notifications):
+    """Queue several notifications as one summary, oldest change first."""
+    def on_sent():
+        for notification in notifications:
+            if notification.homework is not None:
+                commit_change(context, subscription, notification.homework)
+        logging.info(
+            'Отправлена сводка из %d изменений', len(notifications),
+            extra=log_fields(subscription),
+        )
+
+    def on_failed(error):
+        drop_unsent(context, subscription, [
+            notification.homework for notification in notifications
+            if notification.homework is not None
+        ], error)
+
+    header = TEMPLATES.text(
+        'catchup_summary', subscription.locale, count=len(notifications)
+    )
+    messages = coalesce(
+        [header] + [notification.text for notification in notifications]
+    )
+    subscription.last_message = notifications[-1].text
+    for message in messages[:-1]:
+        context.delivery.put(subscription.chat_id, message)
+    context.delivery.put(
+        subscription.chat_id, messages[-1], on_sent, on_failed
+    )
+
+
+def report_error(context, subscription, error):
+    """Notify the subscription chat about a failure, once per window."""
+    if isinstance(error, exceptions.CircuitOpen):
+        logging.debug(
+            'Опрос пропущен: %s', error, extra=log_fields(subscription)
+        )
+        POLLS.inc(subscription.key, 'skipped')
+        return
+    POLLS.inc(subscription.key, 'error')
+    notify_failure(context, subscription, error)
+
+
+def notify_failure(context, subscription, error):
+    """Log a failure and tell the subscription chat, once per window."""
+    if isinstance(error, exceptions.AuthRevoked):
+        template = 'auth_revoked'
+        message = TEMPLATES.text(template, subscription.locale)
+    else:
+        template = 'failure'
+        message = TEMPLATES.text(
+            template, subscription.locale, error=error
+        )
+    logging.error(message, extra=log_fields(subscription))
+    ERRORS.inc(type(error).__name__)
+    # The text may embed addresses or URLs that differ on every attempt.
+    context.delivery.put_error(
+        subscription.chat_id, message, (template, type(error).__name__)
+    )
+
+
+def poll_subscription(context, subscription, fetch=get_api_answer_for):
+    """Run one poll for a single subscription and plan the next one."""
+    try:
+        response = fetch(subscription)
+        for notification in build_notifications(
+            context, subscription, response
+        ):
+            deliver(context, subscription, notification)
+    except Exception as error:
+        context.scheduler.record_failure(subscription.key, error)
+        report_error(context, subscription, error)
     else:
+        context.scheduler.record_success(
+            subscription.key, fresh_homeworks(response)
+        )
+
+
+def catch_up(context, subscription):
+    """Replay everything a subscription missed since its saved cursor."""
+    logging.info(
+        'Догоняем пропущенное с %s', subscription.current_date,
+        extra=log_fields(subscription),
+    )
+    try:
+        response = get_api_answer_for(subscription)
+        notifications = build_notifications(context, subscription, response)
+    except Exception as error:
+        context.scheduler.record_failure(subscription.key, error)
+        report_error(context, subscription, error)
+        return
+    context.scheduler.record_success(
+        subscription.key, fresh_homeworks(response)
+    )
+    if len(notifications) > 1:
+        deliver_summary(context, subscription, notifications)
+    elif notifications:
+        deliver(context, subscription, notifications[0])
+
+
+def ingest_answer(context, registry, key, answer) -> int:
+    """Process homework statuses pushed for a subscription."""
+    subscription = registry.get(key)
+    if subscription is None:
+        raise LookupError(key)
+    answer.setdefault('current_date', subscription.current_date)
+    notifications = build_notifications(context, subscription, answer)
+    for notification in notifications:
+        deliver(context, subscription, notification)
+    context.scheduler.record_push(subscription.key)
+    return len(notifications)
+
+
+def recorded_fetch(event):
+    """Return a fetch that gives back a recorded answer or failure."""
+    def fetch(subscription):
+        if event['kind'] == 'error':
+            raise traffic.error_of(event)
+        if event['unchanged']:
+            return CachedAnswer(event['answer'])
+        return event['answer']
+    return fetch
+
+
+def replay_trace(path, store, bot, speed=None) -> dict:
+    """Feed a recorded trace through the poll pipeline.
+
+    Recorded answers and failures take the path of a real poll: parsing,
+    change detection, the scheduler and delivery to `bot`. At full speed
+    the queue is flushed after every poll, so a replay is deterministic;
+    at a recorded `speed` the sender thread runs with scaled rate limits.
+    """
+    context = BotContext(bot, store)
+    if speed:
+        context.delivery = DeliveryQueue(
+            send=context.send, global_rate=TELEGRAM_GLOBAL_RATE * speed,
+            chat_rate=TELEGRAM_CHAT_RATE * speed,
+        ).start()
+    subscriptions = {}
+
+    def replay_poll(event):
+        key = event['subscription']
+        subscription = subscriptions.get(key)
+        if subscription is None:
+            subscription = subscriptions[key] = Subscription(
+                key, event['chat'], current_date=event.get('from_date')
+            )
+        poll_subscription(context, subscription, recorded_fetch(event))
+        if not speed:
+            context.delivery.flush()
+
+    started = time.perf_counter()
+    try:
+        events = traffic.replay(
+            path, {'answer': replay_poll, 'error': replay_poll}, speed
+        )
+    finally:
+        context.delivery.stop(timeout=None)
+        store.flush()
+    return {
+        'events': dict(events),
+        'subscriptions': len(subscriptions),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+def run_sync(context, registry, fetch=get_api_answer_for):
+    """Poll due subscriptions one after another."""
+    scheduler = context.scheduler
+    while not context.stopping.is_set():
+        for subscription in scheduler.due(registry):
+            if context.stopping.is_set():
+                break
+            poll_subscription(context, subscription, fetch)
+        context.finish_cycle()
+        delay = scheduler.next_deadline(registry) - context.clock()
+        context.clock.wait(context.stopping, max(delay, 0))
+
+
+def simulate(registry, upstream, clock, store, scheduler=None, seed=0):
+    """Poll on simulated time until `clock.until`, jumping between polls.
+
+    `upstream.fetch` stands in for the Practicum API and messages go to
+    an in-memory bot, sent right after every poll. Instead of scanning
+    every subscription each cycle as `run_sync` does, the next poll is
+    taken from a heap, so weeks of polling for thousands of subscriptions
+    cost only the polls. Pass a `scheduler` built with the same clock to
+    try another policy; the default one draws its jitter from `seed`, so
+    runs repeat exactly.
+    """
+    context = BotContext(traffic.ReplayBot(), store, clock)
+    context.scheduler = scheduler or AdaptiveScheduler(
+        rng=random.Random(seed).random, clock=clock
+    )
+    context.delivery = DeliveryQueue(
+        send=context.send, global_rate=float('inf'),
+        chat_rate=float('inf'),
+    )
+    planned = []
+    for number, subscription in enumerate(registry):
+        subscription.current_date = int(clock())
+        planned.append((clock(), number, subscription))
+    heapq.heapify(planned)
+    try:
+        while planned:
+            moment, number, subscription = heapq.heappop(planned)
+            if moment > clock():
+                context.finish_cycle()
+                if clock.wait(context.stopping, moment - clock()):
+                    break
+            poll_subscription(context, subscription, upstream.fetch)
+            context.delivery.flush()
+            schedule = context.scheduler.schedule_for(subscription.key)
+            if not schedule.suspended:
+                heapq.heappush(
+                    planned, (schedule.next_poll_at, number, subscription)
+                )
+    finally:
+        context.delivery.stop()
+    return context
+
+
+def run_async(context, registry):
+    """Poll on threads: the former event-loop mode was threads in disguise.
+
+    Its polls ran the blocking pipeline on the loop's executor, so it
+    offered nothing the thread pool does not.
+    """
+    logging.warning('Режим опроса async упразднён, используется threads')
+    run_threads(context, registry)
+
+
+def run_threads(context, registry):
+    """Poll subscriptions on a pool of worker threads."""
+    from thread_poller import ThreadPoller
+
+    poller = ThreadPoller(
+        poll=functools.partial(poll_subscription, context),
+        scheduler=context.scheduler,
+        after_cycle=context.finish_cycle,
+        stopping=context.stopping,
+    )
+    poller.run_forever(registry)
+
+
+POLL_MODES = {
+    'sync': run_sync,
+    'async': run_async,
+    'threads': run_threads,
+}
+
+
+def run_worker(shard_index=0, shard_count=1):
+    """Poll the subscriptions of one shard until stopped."""
+    registry = load_subscriptions()
+    if not TELEGRAM_TOKEN or not registry:
         error_message = (
-            """Отсутствует одна из или все обязательные переменные окружения: '
-            'PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID. '
-            'Программа принудительно остановлена."""
+            'Отсутствует одна из или все обязательные переменные окружения: '
+            'PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID '
+            '(или SUBSCRIPTIONS_FILE). '
+            'Программа принудительно остановлена.'
         )
         logging.critical(error_message)
         sys.exit(error_message)
-    current_timestamp = int(time.time())
-    last_response = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response['current_date']
-            homework = check_response(response)
-            if not homework:
-                message = 'Нет домашних работ'
-                logging.info(message)
-                result = message
-                if result != last_response:
-                    send_message(bot, result)
-                    last_response = result
-                    logging.info(f'Успешно отправлено сообщение "{result}"')
-                continue
-            result = parse_status(homework[0])
-            if result != last_response:
-                send_message(bot, result)
-                last_response = result
-                logging.info(f'Успешно отправлено сообщение "{result}"')
-            else:
-                logging.debug('Новые сообщения отсутствуют')
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            send_message(bot, message)
-            logging.error(message)
-        finally:
-            time.sleep(RETRY_TIME)
+    registry = select_shard(registry, shard_index, shard_count)
+    context = BotContext(None, storage.open_store())
+    started_at = int(context.clock())
+    for subscription in registry:
+        subscription.current_date = (
+            context.store.load_cursor(subscription.key) or started_at
+        )
+    logging.info(
+        'Шард %d/%d, подписок в работе: %d, режим: %s',
+        shard_index + 1, shard_count, len(registry), POLL_MODE,
+    )
+    context.start(
+        int(METRICS_PORT) + shard_index if METRICS_PORT else None
+    )
+    if traffic.TRAFFIC_RECORD:
+        record_traffic(registry, shard_index, shard_count)
+    signal.signal(signal.SIGTERM, context.stop)
+    signal.signal(signal.SIGINT, context.stop)
+    signal.signal(signal.SIGUSR1, profiling.on_signal)
+    catchup = CatchUp(
+        replay=functools.partial(catch_up, context),
+        backlog=context.delivery.qsize,
+        stopping=context.stopping,
+    )
+    metrics.REGISTRY.gauge(
+        'homework_catchup_pending', 'Subscriptions still being caught up.',
+        function=catchup.pending,
+    )
+    catchup.start(registry)
+    if ingest.INGEST_PORT:
+        ingest.serve(
+            functools.partial(ingest_answer, context, registry),
+            int(ingest.INGEST_PORT) + shard_index,
+        )
+    try:
+        POLL_MODES[POLL_MODE](context, catchup.live(registry))
+    finally:
+        catchup.join()
+        context.close()
+        traffic.stop_recording()
+
+
+def record_traffic(registry, shard_index, shard_count):
+    """Start recording a trace, one file per worker, without secrets."""
+    path = traffic.TRAFFIC_RECORD
+    if shard_count > 1:
+        base, extension = os.path.splitext(path)
+        path = f'{base}.worker-{shard_index}{extension}'
+    secrets = [PRACTICUM_TOKEN, TELEGRAM_TOKEN]
+    secrets.extend(subscription.token for subscription in registry)
+    traffic.start_recording(path, secrets)
+    logging.info('Трафик записывается в %s', path)
+
+
+def run_forked_worker(shard_index, shard_count, worker_index, workers):
+    """Run a worker process of the supervisor with its own log writer.
+
+    The worker polls its part of the dyno's shard. The fork inherits the
+    supervisor's signal handlers: until `run_worker` installs its own, a
+    SIGTERM must end the worker, not make it stop its siblings.
+    """
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGUSR1, profiling.on_signal)
+    logs.reopen(f'worker-{worker_index}')
+    try:
+        run_worker(
+            *worker_shard(shard_index, shard_count, worker_index, workers)
+        )
+    finally:
+        logs.shutdown()
+
+
+def main():
+    """Run the main logic."""
+    if POLL_MODE not in POLL_MODES:
+        sys.exit(f'Неизвестный режим опроса: {POLL_MODE}')
+    if WORKERS > 1:
+        if storage.STATE_BACKEND != 'sqlite':
+            sys.exit('Несколько воркеров требуют STATE_BACKEND=sqlite')
+        from supervisor import Supervisor
+
+        Supervisor(
+            functools.partial(run_forked_worker, *shard_from_env()), WORKERS
+        ).run()
+    else:
+        run_worker(*shard_from_env())
 
 
 if __name__ == '__main__':
-    log_format = (
-        '%(asctime)s: %(name)s  [%(levelname)s] %(message)s'
-    )
-    log_file = os.path.join(BASE_DIR, 'output.log')
-    log_stream = sys.stdout
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler(log_stream)
-        ]
-    )
-    main()
+    logs.setup(os.path.join(BASE_DIR, 'output.log'))
+    try:
+        main()
+    finally:
+        logs.shutdown()
@@ -0,0 +1,63 @@
+"""Long-lived pooled HTTP client shared by all pollers.
+
+`requests` is imported when the client is first built, not with this
+module, so a cold start does not pay for it before the first poll.
+"""
+import os
+import threading
+
+import exceptions
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 100))
+CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class HttpClient:
+    """A keep-alive session with a bounded connection pool and timeouts."""
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT):
+        """Open a session with a pool of `pool_size` connections."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = (connect_timeout, read_timeout)
+        self.transport_errors = (requests.ConnectionError, requests.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            pool_block=True,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url, **kwargs):
+        """Make a GET request reusing pooled connections.
+
+        Connection failures and timeouts become TransientNetworkError.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            return self.session.get(url, **kwargs)
+        except self.transport_errors as err:
+            raise exceptions.TransientNetworkError(
+                f'Ошибка соединения: {err}') from err
+
+    def close(self):
+        """Close every pooled connection."""
+        self.session.close()
+
+
+def get_client() -> HttpClient:
+    """Return the process-wide client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
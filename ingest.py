@@ -0,0 +1,129 @@
+"""Local HTTP endpoint for homework statuses pushed by a relay.
+
+A relay or proxy that learns about reviews first can POST them to
+
+    /subscriptions/<subscription key>/homework_statuses
+
+in the shape of a homework_statuses answer, a list of its `homeworks`
+entries or a single entry. Events go through the same validation, change
+detection and delivery as polled answers. A change is pending from its
+detection until it is sent, so a repeated push, or a push overlapping a
+poll of the same work, is sent once.
+"""
+import hmac
+import json
+import logging
+import os
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import exceptions
+
+INGEST_PORT = os.getenv('INGEST_PORT')
+INGEST_HOST = os.getenv('INGEST_HOST', '127.0.0.1')
+INGEST_SECRET = os.getenv('INGEST_SECRET')
+MAX_BODY_SIZE = 1024 * 1024
+
+PATH = re.compile(r'^/subscriptions/(?P<key>[0-9a-f]+)/homework_statuses/?$')
+
+
+def as_answer(payload) -> dict:
+    """Bring a pushed payload to the shape of a homework_statuses answer."""
+    if isinstance(payload, list):
+        return {'homeworks': payload}
+    if not isinstance(payload, dict):
+        raise exceptions.UnexpectedType(
+            f'Ожидался объект или список, получен {type(payload).__name__}'
+        )
+    if 'homeworks' not in payload:
+        return {'homeworks': [payload]}
+    return payload
+
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """Accepts pushed events and hands them to the server's `handle`."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def reply(self, status, payload):
+        """Send a JSON answer."""
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def authorized(self) -> bool:
+        """Check the shared secret, if one is configured."""
+        secret = self.server.secret
+        return not secret or hmac.compare_digest(
+            self.headers.get('Authorization', ''), f'Bearer {secret}'
+        )
+
+    def read_json(self):
+        """Return the decoded body or None after replying with an error."""
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            self.reply(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'ok': False})
+            return None
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError as error:
+            self.reply(HTTPStatus.BAD_REQUEST, {
+                'ok': False, 'error': f'Некорректный JSON: {error}'
+            })
+            return None
+
+    def do_POST(self):
+        """Feed pushed homework statuses into the pipeline."""
+        match = PATH.match(self.path)
+        if match is None:
+            self.reply(HTTPStatus.NOT_FOUND, {'ok': False})
+            return
+        if not self.authorized():
+            self.reply(HTTPStatus.UNAUTHORIZED, {'ok': False})
+            return
+        payload = self.read_json()
+        if payload is None:
+            return
+        try:
+            sent = self.server.handle(match['key'], as_answer(payload))
+        except exceptions.SomethingWentWrong as error:
+            self.reply(HTTPStatus.BAD_REQUEST, {
+                'ok': False, 'error': str(error)
+            })
+        except LookupError:
+            self.reply(HTTPStatus.NOT_FOUND, {
+                'ok': False, 'error': 'Неизвестная подписка'
+            })
+        except Exception as error:
+            logging.exception('Сбой при приёме событий: %s', error)
+            self.reply(HTTPStatus.INTERNAL_SERVER_ERROR, {'ok': False})
+        else:
+            self.reply(HTTPStatus.OK, {'ok': True, 'notifications': sent})
+
+    def log_message(self, format, *args):
+        """Keep access logs out of the bot log."""
+        logging.debug(format, *args)
+
+
+def serve(handle, port, host=INGEST_HOST,
+          secret=INGEST_SECRET) -> ThreadingHTTPServer:
+    """Accept pushed events from a background thread.
+
+    `handle(key, answer)` processes the events of one subscription and
+    returns the number of notifications queued; it raises LookupError for
+    an unknown key and SomethingWentWrong for an answer it cannot use.
+    """
+    server = ThreadingHTTPServer((host, port), IngestHandler)
+    server.daemon_threads = True
+    server.handle = handle
+    server.secret = secret
+    threading.Thread(
+        target=server.serve_forever, name='ingest', daemon=True
+    ).start()
+    logging.info('Приём событий на порту %s', server.server_port)
+    return server
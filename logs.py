@@ -0,0 +1,245 @@
+"""Non-blocking logging: callers enqueue records, one thread writes them.
+
+The poll loop only puts records on a bounded queue; formatting and disk
+and stdout I/O happen in a background QueueListener. The log file is
+rotated by size or, with LOG_ROTATE_WHEN, by time, and LOG_FORMAT=json
+writes JSON lines carrying the subscription of the record. Identical
+INFO/DEBUG messages of one subscription, such as 'Нет домашних работ',
+are sampled: at most LOG_SAMPLE_BURST of them per LOG_SAMPLE_INTERVAL
+seconds are written and the next one written reports how many were
+skipped.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+import metrics
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_SAMPLE_INTERVAL = float(os.getenv('LOG_SAMPLE_INTERVAL', 60))
+LOG_SAMPLE_BURST = int(os.getenv('LOG_SAMPLE_BURST', 1))
+
+TEXT_FORMAT = '%(asctime)s: %(name)s  [%(levelname)s] %(message)s'
+EXTRA_FIELDS = ('subscription', 'chat_id', 'suppressed')
+MAX_SAMPLE_KEYS = 1024
+
+DROPPED = metrics.REGISTRY.counter(
+    'homework_log_records_dropped_total',
+    'Log records dropped because the log queue was full.',
+)
+
+_pipeline = None
+
+
+class TextFormatter(logging.Formatter):
+    """The classic line format plus the count of sampled-out repeats."""
+
+    def format(self, record):
+        """Format the line and note skipped repeats."""
+        line = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            line += f' (пропущено повторов: {suppressed})'
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the fields passed in `extra`."""
+
+    def format(self, record):
+        """Serialize the record to a JSON line."""
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for name in EXTRA_FIELDS:
+            value = getattr(record, name, None)
+            if value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Let through `burst` identical messages per `interval` seconds.
+
+    Messages are told apart by their template, arguments and subscription,
+    so they are not rendered here and the same line about different
+    subscriptions, e.g. a delivery confirmation, is never merged. WARNING
+    and above are never sampled.
+    """
+
+    def __init__(self, interval=LOG_SAMPLE_INTERVAL, burst=LOG_SAMPLE_BURST,
+                 clock=time.monotonic):
+        """Let `burst` messages through per `interval` seconds."""
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.clock = clock
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(record):
+        """Return what makes two records the same message."""
+        subscription = getattr(record, 'subscription', None)
+        key = (
+            record.name, record.levelno, subscription, record.msg,
+            record.args,
+        )
+        try:
+            hash(key)
+        except TypeError:
+            key = (
+                record.name, record.levelno, subscription,
+                record.getMessage(),
+            )
+        return key
+
+    def filter(self, record):
+        """Return False for a repeat beyond the burst of its window."""
+        if self.interval <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = self.key(record)
+        now = self.clock()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                if len(self._windows) >= MAX_SAMPLE_KEYS:
+                    self._prune(now)
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.burst:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def _prune(self, now):
+        self._windows = {
+            key: window for key, window in self._windows.items()
+            if now - window[0] < self.interval
+        }
+
+
+class PipelineHandler(logging.handlers.QueueHandler):
+    """Puts records on the queue as they are and never blocks the caller.
+
+    Unlike the stock QueueHandler the message is not rendered here: the
+    listener thread formats it. When the queue is full the record is
+    dropped and counted.
+    """
+
+    def prepare(self, record):
+        """Leave formatting to the listener thread."""
+        return record
+
+    def enqueue(self, record):
+        """Queue the record or drop it if the queue is full."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED.inc()
+
+
+def file_handler(path) -> logging.Handler:
+    """Return a handler rotating `path` by time or by size."""
+    if LOG_ROTATE_WHEN:
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8', delay=True,
+        )
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8', delay=True,
+    )
+
+
+class LogPipeline:
+    """Root logger -> sampling -> queue -> writer thread -> file, stdout."""
+
+    def __init__(self, log_file, level=LOG_LEVEL, json_lines=None,
+                 stream=None, queue_size=LOG_QUEUE_SIZE):
+        """Configure the pipeline; `start()` runs it."""
+        self.log_file = log_file
+        self.level = level
+        if json_lines is None:
+            json_lines = LOG_FORMAT == 'json'
+        self.formatter = JsonFormatter() if json_lines else TextFormatter(
+            TEXT_FORMAT
+        )
+        self.stream = stream or sys.stdout
+        self.queue_size = queue_size
+        self.handler = PipelineHandler(queue.Queue(queue_size))
+        self.handler.addFilter(SamplingFilter())
+        self.listener = None
+
+    def start(self, log_file=None):
+        """Start the writer thread, writing to `log_file` if given."""
+        handlers = [file_handler(log_file or self.log_file)]
+        handlers.append(logging.StreamHandler(self.stream))
+        for handler in handlers:
+            handler.setFormatter(self.formatter)
+        self.listener = logging.handlers.QueueListener(
+            self.handler.queue, *handlers
+        )
+        self.listener.start()
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        if self.handler not in root.handlers:
+            root.addHandler(self.handler)
+
+    def reopen(self, suffix):
+        """Start a fresh queue and writer in a forked worker process.
+
+        The writer thread of the parent does not survive the fork, and
+        several processes rotating one file would clobber each other, so
+        the worker writes to its own file: output.log -> output.<suffix>.log.
+        """
+        base, extension = os.path.splitext(self.log_file)
+        self.handler.queue = queue.Queue(self.queue_size)
+        self.start(f'{base}.{suffix}{extension}')
+
+    def stop(self):
+        """Write out the queued records and stop the writer thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
+
+
+def setup(log_file, **options) -> LogPipeline:
+    """Route the root logger through a new pipeline and start it."""
+    global _pipeline
+    _pipeline = LogPipeline(log_file, **options)
+    _pipeline.start()
+    return _pipeline
+
+
+def reopen(suffix):
+    """Restart the pipeline in a forked worker, if one is set up."""
+    if _pipeline is not None:
+        _pipeline.reopen(suffix)
+
+
+def shutdown():
+    """Flush and stop the pipeline, if one is set up."""
+    if _pipeline is not None:
+        _pipeline.stop()
@@ -0,0 +1,254 @@
+"""Prometheus-style metrics for the poll loop."""
+import bisect
+import functools
+import hmac
+import json
+import logging
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(
+        f'{name}="{value}"' for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """A named family of values split by label values."""
+
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        """Describe a metric with optional label names."""
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def header(self) -> list:
+        """Return the HELP and TYPE lines."""
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ]
+
+    def render(self) -> list:
+        """Return the lines of the text format."""
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f'{self.name}{_format_labels(self.labels, key)} {value}'
+            for key, value in items
+        ]
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    kind = 'counter'
+
+    def inc(self, *labels, amount=1):
+        """Add to the value for the given label values."""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        """Return the current value for the given label values."""
+        return self._values.get(labels, 0)
+
+
+class Gauge(Metric):
+    """A value that is set, or computed by a function when rendered."""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        """Create a gauge, read from `function` if given."""
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def set(self, value, *labels):
+        """Set the value for the given label values."""
+        with self._lock:
+            self._values[labels] = value
+
+    def values(self) -> dict:
+        """Return a copy of every value by label values."""
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list:
+        """Refresh a computed value and return the text format."""
+        if self.function is not None:
+            self.set(self.function())
+        return super().render()
+
+
+class Histogram(Metric):
+    """Observations counted into cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(),
+                 buckets=DEFAULT_BUCKETS):
+        """Create a histogram with the given bucket bounds."""
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        """Count one observation."""
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0
+                ]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def time(self, *labels):
+        """Decorate a function to observe how long its calls take."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - started, *labels)
+            return wrapper
+        return decorator
+
+    def render(self) -> list:
+        """Return buckets, sum and count in the text format."""
+        with self._lock:
+            items = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._values.items()
+            ]
+        lines = self.header()
+        names = self.labels + ('le',)
+        for key, counts, total, count in items:
+            cumulative = 0
+            bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                labels = _format_labels(names, key + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Registry:
+    """All metrics of the process."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric, replacing one with the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=(), function=None) -> Gauge:
+        """Create and register a gauge."""
+        return self.register(Gauge(name, documentation, labels, function))
+
+    def histogram(self, name, documentation, labels=(),
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(
+            Histogram(name, documentation, labels, buckets)
+        )
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def dump(self, path):
+        """Write a text dump of every metric to a file."""
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.render())
+
+
+REGISTRY = Registry()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves `/metrics` and the admin actions of the server."""
+
+    def do_GET(self):
+        """Return the metrics page."""
+        if self.path != '/metrics':
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Run an admin action; only with the configured secret."""
+        action = self.server.actions.get(self.path)
+        if action is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        secret = self.server.secret
+        if not secret or not hmac.compare_digest(
+            self.headers.get('Authorization', ''), f'Bearer {secret}'
+        ):
+            self.send_error(HTTPStatus.FORBIDDEN)
+            return
+        body = json.dumps(action(), ensure_ascii=False).encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep access logs out of the bot log."""
+        logging.debug(format, *args)
+
+
+def serve(port, registry=REGISTRY, host='0.0.0.0', actions=None,
+          secret=None) -> ThreadingHTTPServer:
+    """Expose the registry over HTTP from a background thread.
+
+    `actions` maps POST paths to callables returning a JSON-able result;
+    they are refused unless `secret` is set and sent as a Bearer token.
+    """
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    server.actions = actions or {}
+    server.secret = secret
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    logging.info('Метрики доступны на порту %s', server.server_port)
+    return server
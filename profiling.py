@@ -0,0 +1,232 @@
+"""On-demand profiling of a running worker.
+
+A session is started and stopped by SIGUSR1 or by POSTing to
+/debug/profile/start and /debug/profile/stop on the metrics port (with
+`Authorization: Bearer $PROFILE_SECRET`). While it runs:
+
+* a sampler thread records the stacks of every thread, so the sync and
+  threads poll modes are both covered;
+* tracemalloc traces allocations made during the session;
+* the pipeline steps wrapped in `timed` count their calls and durations.
+
+Stopping writes three files to PROFILE_DIR: collapsed stacks for
+flamegraph.pl or speedscope, the allocations that are still alive by
+source line, and the step timings as JSON.
+"""
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))
+PROFILE_MEMORY_FRAMES = int(os.getenv('PROFILE_MEMORY_FRAMES', 10))
+PROFILE_SECRET = os.getenv('PROFILE_SECRET')
+MEMORY_TOP = 50
+
+_session = None
+_lock = threading.Lock()
+
+
+def frame_name(frame) -> str:
+    """Name a stack frame as module:function."""
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f'{module}:{code.co_name}'
+
+
+class StackSampler:
+    """Counts the stacks of all other threads every `interval` seconds."""
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        """Sample stacks every `interval` seconds once started."""
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profiler', daemon=True
+        )
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            names = {
+                thread.ident: thread.name for thread in threading.enumerate()
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, path):
+        """Write the stacks in the collapsed format, hottest first."""
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+class ProfileSession:
+    """One profiling window: stack samples, allocations and step timings."""
+
+    def __init__(self, directory=PROFILE_DIR, interval=PROFILE_INTERVAL,
+                 memory_frames=PROFILE_MEMORY_FRAMES):
+        """Prepare a session writing its files to `directory`."""
+        self.directory = directory
+        self.sampler = StackSampler(interval)
+        self.memory_frames = memory_frames
+        self.timings = {}
+        self.started = None
+        self._traced_before = tracemalloc.is_tracing()
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Begin sampling, tracing allocations and timing steps."""
+        self.started = time.time()
+        if self.memory_frames and not self._traced_before:
+            tracemalloc.start(self.memory_frames)
+        if tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+        self.sampler.start()
+
+    def observe(self, name, seconds):
+        """Count one call of a timed step."""
+        with self._lock:
+            stats = self.timings.get(name)
+            if stats is None:
+                stats = self.timings[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def summary(self) -> dict:
+        """Return calls, total, mean and max seconds per timed step."""
+        with self._lock:
+            return {
+                name: {
+                    'calls': calls,
+                    'total': total,
+                    'mean': total / calls,
+                    'max': longest,
+                }
+                for name, (calls, total, longest) in self.timings.items()
+            }
+
+    def stop(self) -> dict:
+        """Finish the session and write its reports; return their paths."""
+        self.sampler.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(
+            self.directory,
+            f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}',
+        )
+        paths = {
+            'stacks': f'{prefix}.stacks.txt',
+            'timings': f'{prefix}.timings.json',
+        }
+        self.sampler.write(paths['stacks'])
+        with open(paths['timings'], 'w', encoding='utf-8') as file:
+            json.dump({
+                'seconds': time.time() - self.started,
+                'samples': self.sampler.samples,
+                'steps': self.summary(),
+            }, file, indent=2)
+        if self._snapshot is not None:
+            paths['memory'] = f'{prefix}.memory.txt'
+            self.write_memory(paths['memory'])
+        return paths
+
+    def write_memory(self, path):
+        """Write the allocation growth since the start, biggest first."""
+        ignore = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        )
+        snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+        if not self._traced_before:
+            tracemalloc.stop()
+        diff = snapshot.compare_to(
+            self._snapshot.filter_traces(ignore), 'lineno'
+        )
+        with open(path, 'w', encoding='utf-8') as file:
+            for stat in diff[:MEMORY_TOP]:
+                file.write(f'{stat}\n')
+
+
+def timed(name):
+    """Decorate a step to be timed while a session is running."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            session = _session
+            if session is None:
+                return func(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                session.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def start(**options) -> dict:
+    """Start a session unless one is running."""
+    global _session
+    with _lock:
+        if _session is not None:
+            return {'running': True}
+        session = ProfileSession(**options)
+        session.start()
+        _session = session
+    logging.info('Профилирование запущено')
+    return {'running': True}
+
+
+def stop() -> dict:
+    """Stop the running session and return the paths of its reports."""
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is None:
+        return {'running': False}
+    paths = session.stop()
+    logging.info('Профилирование остановлено, отчёты: %s', paths)
+    return {'running': False, 'reports': paths}
+
+
+def toggle() -> dict:
+    """Start a session, or stop the running one."""
+    return stop() if _session is not None else start()
+
+
+def on_signal(signum, frame):
+    """Toggle profiling from a signal without writing files in the handler."""
+    threading.Thread(target=toggle, name='profile-toggle').start()
+
+
+ADMIN_ACTIONS = {
+    '/debug/profile/start': start,
+    '/debug/profile/stop': stop,
+}
@@ -0,0 +1,185 @@
+"""Adaptive polling intervals per subscription."""
+import email.utils
+import os
+import random
+import time
+
+import exceptions
+
+POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 6))
+POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 600))
+POLL_JITTER = float(os.getenv('POLL_JITTER', 0.1))
+BACKOFF_FACTOR = 2
+# Far past any max interval; keeps the power a small float however long
+# an outage lasts (6 * 2 ** 1024 no longer fits one).
+MAX_BACKOFF_EXPONENT = 16
+
+ACTIVE_STATUSES = frozenset(['reviewing'])
+
+
+def parse_retry_after(value):
+    """Turn a Retry-After header into seconds, None if it is unusable."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - time.time(), 0)
+
+
+class PollSchedule:
+    """When a subscription is polled next and why."""
+
+    __slots__ = (
+        'interval', 'failures', 'reviewing', 'suspended', 'pushed',
+        'next_poll_at',
+    )
+
+    def __init__(self, interval):
+        """Plan an immediate first poll."""
+        self.interval = interval
+        self.failures = 0
+        self.reviewing = False
+        self.suspended = False
+        self.pushed = False
+        self.next_poll_at = 0.0
+
+
+class AdaptiveScheduler:
+    """Fast polls while a work is reviewed, exponential backoff otherwise.
+
+    An empty answer or a failure doubles the interval up to
+    `max_interval`, any change in homeworks or a work under review brings it
+    back to `min_interval`. Server hints such as Retry-After are never
+    undercut. Permanent errors are retried at `max_interval` right away,
+    and a revoked token suspends its subscription until `resume()`. A
+    subscription fed by push events is only polled at `max_interval`, as a
+    safety net. Time comes from `clock`, which a simulation can replace.
+    """
+
+    def __init__(self, min_interval=POLL_MIN_INTERVAL,
+                 max_interval=POLL_MAX_INTERVAL, jitter=POLL_JITTER,
+                 rng=random.random, clock=time.time):
+        """Configure the intervals, their jitter and the clock."""
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.rng = rng
+        self.clock = clock
+        self._schedules = {}
+
+    def schedule_for(self, key) -> PollSchedule:
+        """Return the schedule of a subscription, creating it if needed."""
+        schedule = self._schedules.get(key)
+        if schedule is None:
+            schedule = PollSchedule(self.min_interval)
+            self._schedules[key] = schedule
+        return schedule
+
+    def _spread(self, delay):
+        delay *= 1 + self.jitter * (2 * self.rng() - 1)
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def record_success(self, key, homeworks, now=None) -> float:
+        """Plan the next poll after a valid answer."""
+        now = self.clock() if now is None else now
+        schedule = self.schedule_for(key)
+        schedule.failures = 0
+        if homeworks:
+            schedule.reviewing = any(
+                homework.get('status') in ACTIVE_STATUSES
+                for homework in homeworks
+            )
+        if schedule.pushed:
+            schedule.interval = self.max_interval
+        elif homeworks or schedule.reviewing:
+            schedule.interval = self.min_interval
+        else:
+            schedule.interval = min(
+                schedule.interval * BACKOFF_FACTOR, self.max_interval
+            )
+        delay = self._spread(schedule.interval)
+        schedule.next_poll_at = now + delay
+        return delay
+
+    def record_failure(self, key, error, now=None) -> float:
+        """Plan the next poll after a failed one, by the kind of error."""
+        now = self.clock() if now is None else now
+        schedule = self.schedule_for(key)
+        if isinstance(error, exceptions.CircuitOpen):
+            # The request was never made: wait for the breaker, not longer.
+            schedule.next_poll_at = now + self._spread(error.retry_after)
+            return schedule.next_poll_at - now
+        if isinstance(error, exceptions.AuthRevoked):
+            schedule.suspended = True
+            schedule.next_poll_at = float('inf')
+            return schedule.next_poll_at
+        schedule.failures += 1
+        if isinstance(error, exceptions.PermanentError):
+            delay = self._spread(self.max_interval)
+        else:
+            delay = self._spread(
+                self.min_interval * BACKOFF_FACTOR ** min(
+                    schedule.failures, MAX_BACKOFF_EXPONENT
+                )
+            )
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            delay = max(delay, retry_after)
+        schedule.next_poll_at = now + delay
+        return delay
+
+    def record_push(self, key, now=None) -> float:
+        """Slow down polling of a subscription that receives push events."""
+        now = self.clock() if now is None else now
+        schedule = self.schedule_for(key)
+        schedule.pushed = True
+        schedule.interval = self.max_interval
+        delay = self._spread(self.max_interval)
+        schedule.next_poll_at = max(schedule.next_poll_at, now + delay)
+        return delay
+
+    def resume(self, key, now=None):
+        """Poll a suspended subscription again, e.g. after a new token."""
+        schedule = self.schedule_for(key)
+        schedule.suspended = False
+        schedule.failures = 0
+        schedule.next_poll_at = self.clock() if now is None else now
+
+    def suspended(self, key) -> bool:
+        """Tell whether polling of a subscription is suspended."""
+        return self.schedule_for(key).suspended
+
+    def due(self, subscriptions, now=None) -> list:
+        """Return subscriptions whose next poll time has come."""
+        now = self.clock() if now is None else now
+        # Called every cycle for every subscription: look schedules up
+        # directly and create only the missing ones.
+        schedules = self._schedules
+        return [
+            subscription for subscription in subscriptions
+            if (
+                schedules.get(subscription.key)
+                or self.schedule_for(subscription.key)
+            ).next_poll_at <= now
+        ]
+
+    def next_deadline(self, subscriptions) -> float:
+        """Return the earliest planned poll among subscriptions."""
+        schedules = self._schedules
+        deadline = float('inf')
+        for subscription in subscriptions:
+            schedule = (
+                schedules.get(subscription.key)
+                or self.schedule_for(subscription.key)
+            )
+            if schedule.next_poll_at < deadline and not schedule.suspended:
+                deadline = schedule.next_poll_at
+        if deadline == float('inf'):
+            return self.clock() + self.min_interval
+        return deadline
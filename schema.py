@@ -0,0 +1,162 @@
+"""Declarative schema of homework_statuses answers and its compiled validator.
+
+The schema is turned into plain Python source once at import time: one
+straight-line function per object with a type check per field, no loops
+over field descriptions and no per-field try/except. Records come out as
+slotted objects holding only the fields the bot uses; statuses are
+interned, so every record and every tracked state shares one string per
+status.
+"""
+import sys
+from collections import namedtuple
+
+import exceptions
+
+Field = namedtuple('Field', ['name', 'type', 'required', 'intern'])
+Field.__new__.__defaults__ = (True, False)
+
+HOMEWORK_SCHEMA = (
+    Field('id', int, required=False),
+    Field('homework_name', str),
+    Field('status', str, intern=True),
+    Field('date_updated', str, required=False),
+)
+ANSWER_SCHEMA = (
+    Field('current_date', int),
+    Field('homeworks', list),
+)
+
+TYPE_NAMES = {int: 'int', str: 'str', list: 'list', dict: 'dict'}
+
+
+class Record:
+    """Base of compiled records; reads like the dict it was built from."""
+
+    __slots__ = ()
+
+    def __getitem__(self, name):
+        """Read a field by name, like the dict it replaces."""
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name, default=None):
+        """Return a field, or `default` when it is missing or null."""
+        value = getattr(self, name, None)
+        return default if value is None else value
+
+    def __eq__(self, other):
+        """Compare records of the same type field by field."""
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name)
+            for name in self.__slots__
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        """Show the type and every field."""
+        fields = ', '.join(
+            f'{name}={getattr(self, name)!r}' for name in self.__slots__
+        )
+        return f'{type(self).__name__}({fields})'
+
+
+def _wrong_type(path, field, value):
+    return exceptions.UnexpectedType(
+        f'{path}{field.name}: ожидался {TYPE_NAMES[field.type]}, '
+        f'получен {type(value).__name__}'
+    )
+
+
+def _missing(path, field):
+    return exceptions.MissingField(f'{path}{field.name}: поле отсутствует')
+
+
+def _not_object(path, value):
+    return exceptions.UnexpectedType(
+        f'{path.rstrip(".") or "ответ"}: ожидался объект, '
+        f'получен {type(value).__name__}'
+    )
+
+
+def compile_schema(name, schema):
+    """Build a slotted record class and a validator for `schema`.
+
+    The validator takes a decoded JSON object and a path prefix for error
+    messages and returns a record or raises UnexpectedType/MissingField
+    naming the exact field.
+    """
+    record = type(name, (Record,), {
+        '__slots__': tuple(field.name for field in schema),
+        '__doc__': f'Validated {name} with {len(schema)} fields.',
+    })
+    lines = [
+        'def validate(data, path=""):',
+        '    if not isinstance(data, dict):',
+        '        raise _not_object(path, data)',
+        '    get = data.get',
+    ]
+    for number, field in enumerate(schema):
+        value = f'v{number}'
+        lines.append(f'    {value} = get({field.name!r})')
+        lines.append(
+            f'    if {value}.__class__ is not _types[{number}]:'
+        )
+        missing = f'_missing(path, _fields[{number}])'
+        wrong = f'_wrong_type(path, _fields[{number}], {value})'
+        if field.required:
+            lines.append(
+                f'        raise {missing} if {value} is None else {wrong}'
+            )
+        else:
+            lines.append(f'        if {value} is not None:')
+            lines.append(f'            raise {wrong}')
+        if field.intern and field.required:
+            lines.append(f'    {value} = _intern({value})')
+        elif field.intern:
+            lines.append(f'    if {value} is not None:')
+            lines.append(f'        {value} = _intern({value})')
+    lines.append('    record = _new(_record)')
+    for number, field in enumerate(schema):
+        lines.append(f'    record.{field.name} = v{number}')
+    lines.append('    return record')
+    namespace = {
+        '_types': tuple(field.type for field in schema),
+        '_fields': schema,
+        '_record': record,
+        '_new': object.__new__,
+        '_intern': sys.intern,
+        '_missing': _missing,
+        '_wrong_type': _wrong_type,
+        '_not_object': _not_object,
+    }
+    exec('\n'.join(lines), namespace)
+    return record, namespace['validate']
+
+
+Homework, validate_homework = compile_schema('Homework', HOMEWORK_SCHEMA)
+Answer, validate_envelope = compile_schema('Answer', ANSWER_SCHEMA)
+
+
+def iter_homeworks(homeworks):
+    """Validate homework objects one by one, e.g. while streaming."""
+    for index, data in enumerate(homeworks):
+        try:
+            record = validate_homework(data)
+        except exceptions.MalformedPayload:
+            # Validate again only to name the record in the message.
+            validate_homework(data, f'homeworks[{index}].')
+            raise
+        yield record
+
+
+def validate_answer(data) -> Answer:
+    """Validate the whole answer in one pass.
+
+    `homeworks` of the result is a tuple of Homework records.
+    """
+    answer = validate_envelope(data)
+    answer.homeworks = tuple(iter_homeworks(answer.homeworks))
+    return answer
@@ -0,0 +1,88 @@
+"""Consistent-hash assignment of subscriptions to workers."""
+import bisect
+import hashlib
+import os
+import re
+
+VIRTUAL_NODES = 160
+
+
+def _hash(value) -> int:
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class HashRing:
+    """Maps keys to nodes so that adding a node moves about 1/N of keys."""
+
+    def __init__(self, nodes=(), replicas=VIRTUAL_NODES):
+        """Place `nodes` on the ring, `replicas` points each."""
+        self.replicas = replicas
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        """Place a node on the ring."""
+        for replica in range(self.replicas):
+            point = _hash(f'{node}#{replica}')
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node):
+        """Take a node off the ring."""
+        for replica in range(self.replicas):
+            point = _hash(f'{node}#{replica}')
+            if self._owners.pop(point, None) is not None:
+                self._points.remove(point)
+
+    def node_for(self, key):
+        """Return the node owning a key."""
+        if not self._points:
+            raise LookupError('На кольце нет ни одного узла')
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+def shard_ring(count) -> HashRing:
+    """Return the ring of `count` shards numbered from zero."""
+    return HashRing(range(count))
+
+
+def select_shard(registry, index, count):
+    """Keep only the subscriptions owned by shard `index` of `count`."""
+    if count <= 1:
+        return registry
+    ring = shard_ring(count)
+    for subscription in registry:
+        if ring.node_for(subscription.key) != index:
+            registry.remove(subscription.key)
+    return registry
+
+
+def worker_shard(shard_index, shard_count, worker_index, workers) -> tuple:
+    """Return the shard of a forked worker inside the shard of its dyno.
+
+    Every dyno runs the same number of workers, so worker `w` of shard
+    `d` takes shard `d * workers + w` of `shard_count * workers`: the
+    workers of all dynos together still poll each subscription once.
+    """
+    return shard_index * workers + worker_index, shard_count * workers
+
+
+def shard_from_env(environ=os.environ):
+    """Return (index, count) from SHARD_INDEX/SHARD_COUNT.
+
+    On Heroku the index can come from the dyno name: `worker.3` is
+    shard 2 when SHARD_INDEX is not set.
+    """
+    count = int(environ.get('SHARD_COUNT', 1))
+    index = environ.get('SHARD_INDEX')
+    if index is None:
+        match = re.fullmatch(r'\w+\.(\d+)', environ.get('DYNO', ''))
+        index = int(match.group(1)) - 1 if match else 0
+    index = int(index)
+    if not 0 <= index < count:
+        raise ValueError(f'Номер шарда {index} вне диапазона 0..{count - 1}')
+    return index, count
@@ -0,0 +1,114 @@
+"""Simulated Practicum API for fast-forward runs of the poll loop.
+
+Paired with clock.SimulatedClock, it lets weeks of polling for thousands
+of subscriptions run in seconds, to compare scheduling policies by the
+number of API calls and by how late status changes are noticed.
+"""
+import random
+from datetime import datetime, timezone
+
+STATUS_CYCLE = ('reviewing', 'rejected', 'reviewing', 'approved')
+DAY = 24 * 60 * 60
+
+
+class SimulatedHomework:
+    """State of one homework of a simulated student."""
+
+    __slots__ = ('id', 'step', 'updated_at', 'unseen_since', 'next_change_at')
+
+    def __init__(self, homework_id, next_change_at):
+        """Create a homework not yet submitted."""
+        self.id = homework_id
+        self.step = -1
+        self.updated_at = None
+        self.unseen_since = None
+        self.next_change_at = next_change_at
+
+    def as_dict(self) -> dict:
+        """Return the homework as the API lists it."""
+        return {
+            'id': self.id,
+            'homework_name': f'hw-{self.id}',
+            'status': STATUS_CYCLE[self.step % len(STATUS_CYCLE)],
+            'date_updated': datetime.fromtimestamp(
+                self.updated_at, timezone.utc
+            ).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+
+class SimulatedUpstream:
+    """Homeworks whose statuses change at random moments of virtual time.
+
+    Every homework changes its status after an exponentially distributed
+    pause with mean `change_interval`. `fetch(subscription)` answers like
+    homework_statuses for the subscription's cursor and notes how long
+    each change waited for the poll that first returned it.
+    """
+
+    def __init__(self, clock, change_interval=DAY, homeworks=1, seed=0):
+        """Start at `clock()`; students appear on their first fetch."""
+        self.clock = clock
+        self.change_interval = change_interval
+        self.homeworks = homeworks
+        self.rng = random.Random(seed)
+        self.started = clock()
+        self.polls = 0
+        self.changes = 0
+        self.delays = []
+        self._students = {}
+
+    def _pause(self) -> float:
+        return self.rng.expovariate(1 / self.change_interval)
+
+    def _student(self, key) -> list:
+        student = self._students.get(key)
+        if student is None:
+            student = self._students[key] = [
+                SimulatedHomework(number, self.started + self._pause())
+                for number in range(1, self.homeworks + 1)
+            ]
+        return student
+
+    def fetch(self, subscription) -> dict:
+        """Return the homeworks updated since the subscription's cursor."""
+        now = self.clock()
+        self.polls += 1
+        from_date = subscription.current_date or 0
+        answer = []
+        for homework in self._student(subscription.key):
+            while homework.next_change_at <= now:
+                homework.step += 1
+                homework.updated_at = homework.next_change_at
+                if homework.unseen_since is None:
+                    homework.unseen_since = homework.updated_at
+                homework.next_change_at += self._pause()
+                self.changes += 1
+            if homework.updated_at is None or homework.updated_at < from_date:
+                continue
+            answer.append(homework.as_dict())
+            if homework.unseen_since is not None:
+                self.delays.append(now - homework.unseen_since)
+                homework.unseen_since = None
+        return {'current_date': int(now), 'homeworks': answer}
+
+    def stats(self, subscriptions) -> dict:
+        """Summarize API calls and notification delays of the run."""
+        days = max(self.clock() - self.started, 1) / DAY
+        delays = sorted(self.delays)
+
+        def percentile(share):
+            if not delays:
+                return None
+            return delays[min(int(len(delays) * share), len(delays) - 1)]
+
+        return {
+            'days': days,
+            'subscriptions': subscriptions,
+            'polls': self.polls,
+            'polls_per_subscription_day': self.polls / subscriptions / days,
+            'changes': self.changes,
+            'noticed': len(delays),
+            'delay_p50': percentile(0.5),
+            'delay_p99': percentile(0.99),
+            'delay_max': delays[-1] if delays else None,
+        }
@@ -0,0 +1,225 @@
+"""Durable state: poll cursors and last delivered statuses."""
+import json
+import os
+import sqlite3
+import sys
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_BACKEND = os.getenv('STATE_BACKEND', 'sqlite')
+STATE_PATH = os.getenv('STATE_PATH')
+SQLITE_TIMEOUT = 30
+
+DEFAULT_PATHS = {
+    'sqlite': os.path.join(BASE_DIR, 'state.sqlite3'),
+    'file': os.path.join(BASE_DIR, 'state.json'),
+    'memory': None,
+}
+
+
+def normalize_id(homework_id):
+    """Return the in-memory form of a homework id read from the backend.
+
+    Ids are stored as text; numeric ones become ints again, so they match
+    the `id` of schema.Homework records and take less memory.
+    """
+    if isinstance(homework_id, str) and homework_id.isdigit():
+        return int(homework_id)
+    return homework_id
+
+
+class StateStore:
+    """Buffers changes in memory and writes them once per flush.
+
+    Backends implement `_read` and `_write`; reads always see pending
+    changes, so callers never need to flush before looking something up.
+    Only the interned status of every homework is kept in memory,
+    `date_updated` goes straight to the backend.
+    """
+
+    def __init__(self):
+        """Start with empty cursors and statuses."""
+        self._lock = threading.Lock()
+        self._cursors = {}
+        self._statuses = {}
+        self._dirty_cursors = {}
+        self._dirty_statuses = {}
+
+    def load_cursor(self, key):
+        """Return the saved `from_date` of a subscription or None."""
+        with self._lock:
+            return self._cursors.get(key)
+
+    def save_cursor(self, key, current_date):
+        """Remember the cursor until the next flush."""
+        with self._lock:
+            self._cursors[key] = current_date
+            self._dirty_cursors[key] = current_date
+
+    def statuses(self, key) -> dict:
+        """Return the live homework id -> status map of a subscription."""
+        with self._lock:
+            return self._statuses.setdefault(key, {})
+
+    def last_status(self, key, homework_id):
+        """Return the last delivered status or None."""
+        with self._lock:
+            return self._statuses.get(key, {}).get(normalize_id(homework_id))
+
+    def save_status(self, key, homework_id, status, date_updated):
+        """Remember a delivered status until the next flush."""
+        status = sys.intern(status)
+        with self._lock:
+            self._statuses.setdefault(key, {})[homework_id] = status
+            self._dirty_statuses[(key, str(homework_id))] = (
+                status, date_updated
+            )
+
+    def flush(self):
+        """Write every pending change in one batch."""
+        with self._lock:
+            if not self._dirty_cursors and not self._dirty_statuses:
+                return
+            cursors, self._dirty_cursors = self._dirty_cursors, {}
+            statuses, self._dirty_statuses = self._dirty_statuses, {}
+            self._write(cursors, statuses)
+
+    def load(self):
+        """Read the whole state from the backend."""
+        with self._lock:
+            self._cursors, self._statuses = self._read()
+
+    def close(self):
+        """Flush and release the backend."""
+        self.flush()
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _write(self, cursors, statuses):
+        raise NotImplementedError
+
+
+class SQLiteStateStore(StateStore):
+    """State in an SQLite database, one transaction per flush.
+
+    Several worker processes may share one database: each writes only the
+    subscriptions of its own shard.
+    """
+
+    def __init__(self, path):
+        """Open the database at `path`, creating its tables."""
+        super().__init__()
+        self.connection = sqlite3.connect(
+            path, timeout=SQLITE_TIMEOUT, check_same_thread=False
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS cursors (
+                key TEXT PRIMARY KEY,
+                from_date INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS statuses (
+                key TEXT NOT NULL,
+                homework_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                date_updated TEXT,
+                PRIMARY KEY (key, homework_id)
+            );
+            '''
+        )
+        self.load()
+
+    def _read(self):
+        cursors = dict(self.connection.execute(
+            'SELECT key, from_date FROM cursors'
+        ))
+        statuses = {}
+        rows = self.connection.execute(
+            'SELECT key, homework_id, status FROM statuses'
+        )
+        for key, homework_id, status in rows:
+            statuses.setdefault(key, {})[normalize_id(homework_id)] = (
+                sys.intern(status)
+            )
+        return cursors, statuses
+
+    def _write(self, cursors, statuses):
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                cursors.items(),
+            )
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO statuses VALUES (?, ?, ?, ?)',
+                [key + value for key, value in statuses.items()],
+            )
+
+    def close(self):
+        """Flush and close the database."""
+        super().close()
+        self.connection.close()
+
+
+class FileStateStore(StateStore):
+    """State in a JSON file, rewritten atomically on every flush."""
+
+    def __init__(self, path):
+        """Load the state saved at `path`, if any."""
+        super().__init__()
+        self.path = path
+        self.load()
+
+    def _read(self):
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return {}, {}
+        statuses = {
+            key: {
+                normalize_id(homework_id): sys.intern(
+                    value[0] if isinstance(value, list) else value
+                )
+                for homework_id, value in homeworks.items()
+            }
+            for key, homeworks in data['statuses'].items()
+        }
+        return data['cursors'], statuses
+
+    def _write(self, cursors, statuses):
+        data = {'cursors': self._cursors, 'statuses': self._statuses}
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+
+class MemoryStateStore(StateStore):
+    """State that lives only as long as the process, e.g. in simulations."""
+
+    def __init__(self, path=None):
+        """Start empty; `path` is accepted and ignored."""
+        super().__init__()
+
+    def _read(self):
+        return {}, {}
+
+    def _write(self, cursors, statuses):
+        pass
+
+
+BACKENDS = {
+    'sqlite': SQLiteStateStore,
+    'file': FileStateStore,
+    'memory': MemoryStateStore,
+}
+
+
+def open_store(backend=None, path=None) -> StateStore:
+    """Open the given or the configured state backend."""
+    backend = backend or STATE_BACKEND
+    return BACKENDS[backend](path or STATE_PATH or DEFAULT_PATHS[backend])
@@ -0,0 +1,139 @@
+"""Incremental parsing of homework_statuses answers.
+
+A long history (`from_date=0`) can be megabytes of homeworks and reviewer
+comments. Here the body is read chunk by chunk and every homework is
+yielded as soon as it is complete, so peak memory is one chunk plus one
+record whatever the length of the history.
+"""
+import codecs
+import json
+
+import exceptions
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    """Text buffer over byte chunks with just enough JSON tokenizing."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """Read one more chunk, dropping what has been consumed."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+        self.buffer += self._utf8.decode(b'', final=True)
+        self.eof = True
+        return True
+
+    def peek(self) -> str:
+        """Return the next significant character, '' at the end."""
+        while True:
+            while self.pos < len(self.buffer):
+                if self.buffer[self.pos] not in WHITESPACE:
+                    return self.buffer[self.pos]
+                self.pos += 1
+            if not self.fill():
+                return ''
+
+    def expect(self, *chars) -> str:
+        """Consume one of `chars` or fail."""
+        char = self.peek()
+        if char not in chars or not char:
+            raise exceptions.MalformedPayload(
+                f'Некорректный JSON: ожидался {" или ".join(chars)}, '
+                f'получено {char!r}'
+            )
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode one complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as error:
+                if self.fill():
+                    continue
+                raise exceptions.MalformedPayload(
+                    f'Некорректный JSON: {error}'
+                ) from error
+            # A number cut by a chunk border still decodes: make sure the
+            # value really ended before trusting it.
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_answer(chunks, envelope):
+    """Yield homeworks of an answer one by one.
+
+    Every other top-level field lands in `envelope`; it is complete once
+    the generator is exhausted. `homeworks` is set to True in it when the
+    list was present, or to the value itself when it was not a list.
+    """
+    reader = _Reader(chunks)
+    reader.expect('{')
+    if reader.peek() == '}':
+        reader.expect('}')
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'homeworks' and reader.peek() == '[':
+            reader.expect('[')
+            envelope[key] = True
+            if reader.peek() == ']':
+                reader.expect(']')
+            else:
+                while True:
+                    yield reader.value()
+                    if reader.expect(',', ']') == ']':
+                        break
+        else:
+            envelope[key] = reader.value()
+        if reader.expect(',', '}') == '}':
+            return
+
+
+class StreamedAnswer(dict):
+    """An answer whose homeworks are parsed while they are consumed.
+
+    The envelope fields (`current_date`) are known only after
+    `iter_homeworks()` has been exhausted. `homeworks` is then an empty
+    list: the records themselves are never kept.
+    """
+
+    def __init__(self, response, chunk_size=CHUNK_SIZE):
+        """Wrap a streamed response, read nothing yet."""
+        super().__init__()
+        self._response = response
+        self._chunk_size = chunk_size
+
+    def iter_homeworks(self):
+        """Yield homeworks from the response body and release it."""
+        try:
+            yield from iter_answer(
+                self._response.iter_content(self._chunk_size), self
+            )
+        finally:
+            self._response.close()
+        if self.get('homeworks') is True:
+            self['homeworks'] = []
@@ -0,0 +1,75 @@
+"""Registry of Practicum token and Telegram chat pairs served by one worker."""
+import hashlib
+import json
+
+
+def subscription_key(token, chat_id) -> str:
+    """Return the identifier of a token and chat pair."""
+    raw = f'{token}:{chat_id}'.encode()
+    return hashlib.sha256(raw).hexdigest()[:16]
+
+
+class Subscription:
+    """A Practicum token whose statuses are delivered to a Telegram chat."""
+
+    __slots__ = (
+        'token', 'chat_id', 'key', 'locale', 'current_date', 'last_message'
+    )
+
+    def __init__(self, token, chat_id, current_date=None, locale=None):
+        """Pair a Practicum token with a Telegram chat."""
+        self.token = token
+        self.chat_id = chat_id
+        # Stable identifier that does not expose the token; the scheduler
+        # looks it up on every pass, so it is hashed once.
+        self.key = subscription_key(token, chat_id)
+        self.locale = locale
+        self.current_date = current_date
+        self.last_message = ''
+
+    def __repr__(self):
+        """Show the key and the chat, never the token."""
+        return f'<Subscription {self.key} chat={self.chat_id}>'
+
+
+class SubscriptionRegistry:
+    """Many subscriptions polled by a single process."""
+
+    def __init__(self):
+        """Create an empty registry."""
+        self._subscriptions = {}
+
+    def add(self, token, chat_id, locale=None) -> Subscription:
+        """Register a pair, keeping the existing one if already known."""
+        subscription = Subscription(token, chat_id, locale=locale)
+        return self._subscriptions.setdefault(subscription.key, subscription)
+
+    def remove(self, key) -> None:
+        """Forget a subscription by its key."""
+        self._subscriptions.pop(key, None)
+
+    def get(self, key):
+        """Return a subscription by its key or None."""
+        return self._subscriptions.get(key)
+
+    def load(self, path) -> None:
+        """Read subscriptions from a JSON file.
+
+        The file holds a list of objects with `practicum_token`
+        and `chat_id` keys and an optional message `locale`.
+        """
+        with open(path, encoding='utf-8') as file:
+            entries = json.load(file)
+        for entry in entries:
+            self.add(
+                entry['practicum_token'], entry['chat_id'],
+                entry.get('locale'),
+            )
+
+    def __iter__(self):
+        """Iterate over a snapshot of the subscriptions."""
+        return iter(list(self._subscriptions.values()))
+
+    def __len__(self):
+        """Return the number of subscriptions."""
+        return len(self._subscriptions)
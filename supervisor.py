@@ -0,0 +1,66 @@
+"""Supervisor that runs poll workers as separate processes."""
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+
+RESTART_DELAY = float(os.getenv('WORKER_RESTART_DELAY', 5))
+
+
+class Supervisor:
+    """Forks one process per shard and restarts the ones that die.
+
+    `target(index, count)` runs a worker for a shard. SIGTERM and SIGINT
+    are forwarded to every worker, which then finishes its polls and saves
+    its cursors before the supervisor exits.
+    """
+
+    def __init__(self, target, workers, restart_delay=RESTART_DELAY):
+        """Plan `workers` processes running `target`."""
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.stopping = threading.Event()
+        self._context = multiprocessing.get_context('fork')
+        self._processes = {}
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=self.target, args=(index, self.workers),
+            name=f'worker-{index}',
+        )
+        process.start()
+        self._processes[index] = process
+        logging.info('Запущен воркер %d (pid %d)', index, process.pid)
+
+    def stop(self, *args):
+        """Stop restarting workers and ask them to finish."""
+        self.stopping.set()
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+    def forward(self, signum, frame):
+        """Pass a signal, e.g. SIGUSR1 for profiling, to every worker."""
+        for process in self._processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signum)
+
+    def run(self):
+        """Run workers until a stop signal arrives."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGUSR1, self.forward)
+        for index in range(self.workers):
+            self._spawn(index)
+        while not self.stopping.wait(self.restart_delay):
+            for index, process in list(self._processes.items()):
+                if not process.is_alive() and not self.stopping.is_set():
+                    logging.error(
+                        'Воркер %d завершился с кодом %s, перезапуск',
+                        index, process.exitcode,
+                    )
+                    self._spawn(index)
+        for process in self._processes.values():
+            process.join()
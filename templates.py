@@ -0,0 +1,95 @@
+"""Message templates loaded once per locale and compiled at startup."""
+import functools
+import json
+import os
+import string
+
+import exceptions
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MESSAGES_FILE = os.getenv(
+    'MESSAGES_FILE', os.path.join(BASE_DIR, 'messages.json')
+)
+DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'ru')
+RENDER_CACHE_SIZE = 4096
+
+
+def compile_template(template, **known) -> tuple:
+    """Split a template into literal text and the fields left to fill.
+
+    Fields given in `known` are substituted right away, so rendering is a
+    join of a few strings.
+    """
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if field is None:
+            continue
+        if field in known:
+            parts.append(str(known[field]))
+        else:
+            parts.append((field,))
+    return tuple(parts)
+
+
+def fill(compiled, **values) -> str:
+    """Render a compiled template."""
+    return ''.join(
+        values[part[0]] if isinstance(part, tuple) else part
+        for part in compiled
+    )
+
+
+class Templates:
+    """Compiled messages of every locale with a memoized status renderer."""
+
+    def __init__(self, config, default_locale=DEFAULT_LOCALE):
+        """Compile the messages of every locale in `config`."""
+        self.default_locale = default_locale
+        self._statuses = {}
+        self._texts = {}
+        self._verdicts = {}
+        for locale, messages in config.items():
+            verdicts = dict(messages['verdicts'])
+            self._verdicts[locale] = verdicts
+            self._statuses[locale] = {
+                status: compile_template(
+                    messages['status_changed'], verdict=verdict
+                )
+                for status, verdict in verdicts.items()
+            }
+            self._texts[locale] = {
+                name: compile_template(text)
+                for name, text in messages.items()
+                if isinstance(text, str)
+            }
+        self.render_status = functools.lru_cache(RENDER_CACHE_SIZE)(
+            self._render_status
+        )
+
+    @classmethod
+    def load(cls, path=MESSAGES_FILE, default_locale=DEFAULT_LOCALE):
+        """Read and compile templates from a JSON file."""
+        with open(path, encoding='utf-8') as file:
+            return cls(json.load(file), default_locale)
+
+    def _locale(self, locale) -> str:
+        return locale if locale in self._statuses else self.default_locale
+
+    def verdicts(self, locale=None) -> dict:
+        """Return status -> verdict of a locale."""
+        return dict(self._verdicts[self._locale(locale)])
+
+    def _render_status(self, homework_name, status, locale=None) -> str:
+        compiled = self._statuses[self._locale(locale)].get(status)
+        if compiled is None:
+            raise exceptions.UnknownStatus(
+                f'Недокументированный статус: {status}'
+            )
+        return fill(compiled, homework_name=str(homework_name))
+
+    def text(self, name, locale=None, **values) -> str:
+        """Render one of the other messages, e.g. `failure`."""
+        values = {key: str(value) for key, value in values.items()}
+        return fill(self._texts[self._locale(locale)][name], **values)
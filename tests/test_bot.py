@@ -6,6 +6,14 @@ import telegram
 import utils
 
 
+def patch_session_get(monkeypatch, mock_get):
+    """Route requests made through the pooled session to a mock."""
+    monkeypatch.setattr(
+        requests.Session, 'get',
+        lambda session, *args, **kwargs: mock_get(*args, **kwargs)
+    )
+
+
 class MockResponseGET:
 
     def __init__(self, url, params=None, random_timestamp=None,
@@ -186,7 +194,7 @@ class TestHomework:
                 current_timestamp=current_timestamp, **kwargs
             )
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -232,7 +240,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_500_response_get)
+        patch_session_get(monkeypatch, mock_500_response_get)
 
         import homework
 
@@ -315,7 +323,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -352,7 +360,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -400,7 +408,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -448,7 +456,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -484,7 +492,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_no_homeworks_response_get)
+        patch_session_get(monkeypatch, mock_no_homeworks_response_get)
 
         import homework
 
@@ -525,7 +533,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -565,7 +573,7 @@ class TestHomework:
             response.json = valid_response_json
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -599,7 +607,7 @@ class TestHomework:
             response.json = json_invalid
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_empty_response_get)
+        patch_session_get(monkeypatch, mock_empty_response_get)
 
         import homework
 
@@ -626,7 +634,7 @@ class TestHomework:
             )
             return response
 
-        monkeypatch.setattr(requests, 'get', mock_response_get)
+        patch_session_get(monkeypatch, mock_response_get)
 
         import homework
 
@@ -0,0 +1,100 @@
+import pytest
+
+import exceptions
+from breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from scheduler import AdaptiveScheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_breaker(clock, transitions=None):
+    return CircuitBreaker(
+        'API', window=10, min_calls=4, failure_rate=0.5, open_time=30,
+        clock=clock,
+        listener=lambda breaker, old, new: transitions.append((old, new))
+        if transitions is not None else None,
+    )
+
+
+class TestCircuitBreaker:
+
+    def test_opens_on_failure_rate(self):
+        breaker = make_breaker(FakeClock())
+        for success in (True, False, True):
+            breaker.record(success)
+        assert breaker.state == CLOSED, (
+            'Пока вызовов меньше min_calls, предохранитель не срабатывает'
+        )
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+    def test_open_breaker_refuses_calls_cheaply(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now = 10
+        with pytest.raises(exceptions.CircuitOpen) as info:
+            breaker.check()
+        assert info.value.retry_after == 20
+        assert isinstance(info.value, exceptions.SomethingWentWrong)
+
+    def test_single_probe_closes_breaker(self):
+        clock = FakeClock()
+        transitions = []
+        breaker = make_breaker(clock, transitions)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now = 30
+        breaker.check()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(exceptions.CircuitOpen):
+            breaker.check()
+        breaker.record_success()
+        breaker.check()
+        assert transitions == [
+            (CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)
+        ]
+
+    def test_failed_probe_opens_again(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now = 30
+        breaker.check()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 45
+        with pytest.raises(exceptions.CircuitOpen):
+            breaker.check()
+
+    def test_lost_probe_is_retried(self):
+        clock = FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(4):
+            breaker.record_failure()
+        clock.now = 30
+        breaker.check()
+        clock.now = 60
+        breaker.check()
+        assert breaker.state == HALF_OPEN
+
+    def test_skipped_poll_does_not_back_off(self):
+        scheduler = AdaptiveScheduler(min_interval=5, max_interval=600,
+                                      jitter=0)
+        for _ in range(3):
+            delay = scheduler.record_failure(
+                'key', exceptions.CircuitOpen('открыт', 20), now=0
+            )
+        assert delay == 20
+        assert scheduler.schedule_for('key').failures == 0, (
+            'Пропуск из-за предохранителя не должен считаться сбоем'
+        )
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from catchup import CatchUp, is_behind
+from subscriptions import SubscriptionRegistry
+
+NOW = 1_000_000
+
+
+def make_registry(*cursors):
+    registry = SubscriptionRegistry()
+    for number, cursor in enumerate(cursors):
+        registry.add(f'token{number}', number).current_date = cursor
+    return registry
+
+
+class TestCatchUp:
+
+    def test_only_old_cursors_are_behind(self):
+        fresh, old, missing = make_registry(NOW - 10, NOW - 3600, None)
+        assert not is_behind(fresh, NOW, age=600)
+        assert is_behind(old, NOW, age=600)
+        assert not is_behind(missing, NOW, age=600), (
+            'Подписка без сохранённого курсора не требует догоняния'
+        )
+
+    def test_pending_subscriptions_are_hidden_from_live_polling(self):
+        release = threading.Event()
+        registry = make_registry(NOW - 10, NOW - 3600)
+        catchup = CatchUp(replay=lambda subscription: release.wait(2),
+                          age=600)
+        assert catchup.start(registry, NOW) == 1
+        live = catchup.live(registry)
+        assert [item.current_date for item in live] == [NOW - 10], (
+            'Догоняемая подписка не должна опрашиваться в живом режиме'
+        )
+        assert len(live) == 1
+        release.set()
+        catchup.join(2)
+        assert len(list(live)) == 2 and catchup.pending() == 0
+
+    def test_shortest_gap_first_and_errors_release(self):
+        replayed = []
+
+        def replay(subscription):
+            replayed.append(subscription.current_date)
+            raise ValueError('API недоступен')
+
+        registry = make_registry(NOW - 7200, NOW - 3600, NOW - 86400)
+        catchup = CatchUp(replay=replay, age=600)
+        catchup.start(registry, NOW)
+        catchup.join(2)
+        assert replayed == [NOW - 3600, NOW - 7200, NOW - 86400]
+        assert catchup.pending() == 0, (
+            'После ошибки подписка должна вернуться в живой опрос'
+        )
+
+    def test_waits_while_delivery_queue_is_deep(self):
+        backlog = [500]
+        replayed = []
+        catchup = CatchUp(
+            replay=replayed.append, backlog=lambda: backlog[0],
+            queue_limit=100, age=600,
+        )
+        catchup.start(make_registry(NOW - 3600), NOW)
+        time.sleep(0.1)
+        assert not replayed, (
+            'Догоняние не должно начинаться, пока очередь отправки полна'
+        )
+        backlog[0] = 0
+        catchup.join(2)
+        assert len(replayed) == 1
+
+    def test_stop_skips_queued_replays(self):
+        stopping = threading.Event()
+        stopping.set()
+        replayed = []
+        catchup = CatchUp(replay=replayed.append, stopping=stopping, age=600)
+        catchup.start(make_registry(NOW - 3600, NOW - 7200), NOW)
+        catchup.join(2)
+        assert not replayed and catchup.pending() == 0
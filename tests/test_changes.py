@@ -0,0 +1,107 @@
+import sys
+import tracemalloc
+
+from changes import ChangeDetector
+from schema import validate_homework
+
+
+def homework(homework_id, status, date='2022-06-01T10:00:00Z'):
+    return validate_homework({
+        'id': homework_id,
+        'homework_name': f'hw{homework_id}',
+        'status': status,
+        'date_updated': date,
+    })
+
+
+class TestChangeDetector:
+
+    def test_every_changed_homework_is_reported(self):
+        detector = ChangeDetector()
+        changes = detector.diff('sub', [
+            homework(2, 'approved'), homework(1, 'reviewing')
+        ])
+        assert [change.homework_id for change in changes] == [1, 2], (
+            'Должно создаваться событие для каждой изменившейся работы, '
+            'начиная с самой старой'
+        )
+
+    def test_repeated_status_is_not_reported(self):
+        detector = ChangeDetector()
+        for change in detector.diff('sub', [homework(1, 'reviewing')]):
+            detector.commit('sub', change.homework)
+        repeated = homework(1, 'reviewing', date='2022-06-02T10:00:00Z')
+        assert detector.diff('sub', [repeated]) == [], (
+            'Повтор того же статуса не должен приводить к отправке'
+        )
+        changes = detector.diff('sub', [homework(1, 'approved')])
+        assert changes[0].previous == 'reviewing'
+
+    def test_pending_change_is_reported_once(self):
+        detector = ChangeDetector()
+        detector.diff('sub', [homework(1, 'approved')])
+        assert detector.diff('sub', [homework(1, 'approved')]) == [], (
+            'Изменение, ожидающее отправки, не должно находиться повторно'
+        )
+        assert detector.pending('sub') == 1
+        assert len(detector.diff('sub', [homework(1, 'rejected')])) == 1
+
+    def test_released_change_is_reported_again(self):
+        detector = ChangeDetector()
+        change, = detector.diff('sub', [homework(1, 'approved')])
+        detector.release('sub', change.homework)
+        assert len(detector.diff('sub', [homework(1, 'approved')])) == 1, (
+            'Неотправленное изменение должно находиться снова'
+        )
+
+    def test_failed_walk_releases_changes(self):
+        detector = ChangeDetector()
+
+        def broken():
+            yield homework(1, 'approved')
+            raise ValueError('обрыв потока')
+
+        try:
+            detector.diff('sub', broken())
+        except ValueError:
+            pass
+        assert detector.pending('sub') == 0
+        assert len(detector.diff('sub', [homework(1, 'approved')])) == 1
+
+    def test_homework_without_id_is_tracked_by_name(self):
+        detector = ChangeDetector()
+        record = validate_homework({'homework_name': 'hw', 'status': 'x'})
+        detector.commit('sub', record)
+        assert detector.known('sub') == {'hw': 'x'}
+
+    def test_seeded_from_store(self, tmp_path):
+        import storage
+
+        store = storage.open_store('file', str(tmp_path / 'state.json'))
+        store.save_status('sub', 1, 'approved', None)
+        detector = ChangeDetector(store)
+        assert detector.diff('sub', [homework(1, 'approved')]) == []
+        detector.commit('sub', homework(2, 'reviewing'))
+        assert store.last_status('sub', 2) == 'reviewing'
+
+    def test_tracked_homework_fits_in_100_bytes(self):
+        count, per_subscription = 20000, 20
+        keys = [f'sub{number}' for number in range(count // per_subscription)]
+        detector = ChangeDetector()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        records = [
+            homework(1_000_000 + number, 'reviewing')
+            for number in range(count)
+        ]
+        for number, record in enumerate(records):
+            detector.commit(keys[number // per_subscription], record)
+        del records
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        per_homework = (after - before) / count
+        assert per_homework < 100, (
+            'Отслеживаемое состояние работы должно занимать меньше 100 байт, '
+            f'сейчас {per_homework:.0f}'
+        )
+        assert sys.intern('reviewing') is detector.known('sub0')[1_000_000]
@@ -0,0 +1,34 @@
+import threading
+
+from clock import SimulatedClock, SystemClock
+
+
+class TestClock:
+
+    def test_simulated_wait_jumps_to_the_next_tick(self):
+        clock = SimulatedClock(100, resolution=1)
+        stopping = threading.Event()
+        assert not clock.wait(stopping, 2.3)
+        assert clock() == 103, (
+            'Ожидание должно заканчиваться на ближайшем целом тике'
+        )
+
+    def test_simulated_wait_stops_at_until(self):
+        clock = SimulatedClock(0, until=10)
+        stopping = threading.Event()
+        assert not clock.wait(stopping, 6)
+        assert clock.wait(stopping, 6), (
+            'Ожидание, дошедшее до until, должно остановить цикл'
+        )
+        assert clock() == 10 and stopping.is_set()
+
+    def test_set_event_is_not_waited_for(self):
+        clock = SimulatedClock(0)
+        stopping = threading.Event()
+        stopping.set()
+        assert clock.wait(stopping, 60) and clock() == 0
+
+    def test_system_clock_returns_after_the_event(self):
+        stopping = threading.Event()
+        stopping.set()
+        assert SystemClock().wait(stopping, 60)
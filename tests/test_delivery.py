@@ -0,0 +1,136 @@
+import threading
+import time
+
+import exceptions
+from delivery import DeliveryQueue, TokenBucket, coalesce
+
+
+class FloodError(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__('Flood control exceeded')
+        self.retry_after = retry_after
+
+
+class TestDeliveryQueue:
+
+    def test_messages_for_one_chat_are_coalesced(self):
+        sent = []
+        queue = DeliveryQueue(lambda chat, text: sent.append((chat, text)))
+        delivered = threading.Event()
+        queue.put(1, 'первое')
+        queue.put(1, 'второе', on_sent=delivered.set)
+        queue.put(2, 'другой чат')
+        queue.start()
+        assert delivered.wait(2)
+        queue.stop(2)
+        assert (1, 'первое\n\nвторое') in sent, (
+            'Несколько сообщений для одного чата должны объединяться'
+        )
+        assert len(sent) == 2
+
+    def test_error_notifications_are_deduplicated(self):
+        queue = DeliveryQueue(lambda chat, text: None, error_window=60)
+        assert queue.put_error(1, 'Сбой')
+        assert not queue.put_error(1, 'Сбой'), (
+            'Одинаковые ошибки не должны отправляться чаще раза в окно'
+        )
+        assert queue.put_error(2, 'Сбой')
+        assert queue.qsize() == 2
+
+    def test_error_kind_deduplicates_varying_texts(self):
+        now = [0]
+        queue = DeliveryQueue(
+            lambda chat, text: None, error_window=60, clock=lambda: now[0]
+        )
+        assert queue.put_error(1, 'Сбой <object at 0x1>', 'ConnectionError')
+        assert not queue.put_error(
+            1, 'Сбой <object at 0x2>', 'ConnectionError'
+        ), 'Ошибки одного вида должны отправляться раз в окно'
+        assert queue.put_error(1, 'Сбой: таймаут', 'Timeout')
+
+    def test_old_errors_are_forgotten(self):
+        now = [0]
+        queue = DeliveryQueue(
+            lambda chat, text: None, error_window=60, clock=lambda: now[0]
+        )
+        for number in range(100):
+            queue.put_error(1, f'Сбой {number}')
+        now[0] = 61
+        queue.put_error(1, 'Сбой')
+        assert len(queue._recent_errors) == 1, (
+            'Записи старше окна не должны накапливаться'
+        )
+
+    def test_flood_control_is_retried(self):
+        attempts = []
+
+        def send(chat, text):
+            attempts.append(text)
+            if len(attempts) == 1:
+                raise FloodError(retry_after=0.05)
+
+        delivered = threading.Event()
+        queue = DeliveryQueue(send, chat_rate=100).start()
+        queue.put(1, 'статус', on_sent=delivered.set)
+        assert delivered.wait(2), (
+            'После ответа 429 сообщение должно быть отправлено повторно'
+        )
+        queue.stop(2)
+        assert attempts == ['статус', 'статус']
+
+    def test_stop_is_bounded_while_telegram_is_down(self):
+        import exceptions
+
+        def send(chat, text):
+            raise exceptions.CircuitOpen('Telegram API недоступен', 0.05)
+
+        queue = DeliveryQueue(send, chat_rate=100).start()
+        queue.put(1, 'статус')
+        started = time.monotonic()
+        queue.stop(0.2)
+        assert time.monotonic() - started < 1, (
+            'Остановка не должна ждать конца сбоя Telegram'
+        )
+        assert queue.qsize() == 0
+
+    def test_flush_sends_in_the_calling_thread(self):
+        sent = []
+        queue = DeliveryQueue(lambda chat, text: sent.append(text))
+        delivered = []
+        queue.put(1, 'статус', on_sent=lambda: delivered.append(1))
+        queue.put(2, 'другой чат')
+        queue.flush()
+        assert sent == ['статус', 'другой чат'] and delivered == [1], (
+            'flush должен отправить всю очередь без потока отправки'
+        )
+        assert queue.qsize() == 0
+
+    def test_permanent_error_gives_up_at_once(self):
+        attempts = []
+        error = exceptions.ChatUnavailable('Forbidden: bot was blocked')
+
+        def send(chat, text):
+            attempts.append(text)
+            raise error
+
+        queue = DeliveryQueue(send)
+        failed = []
+        queue.put(1, 'статус', on_failed=failed.append)
+        queue.flush()
+        assert attempts == ['статус'] and failed == [error], (
+            'Постоянная ошибка не должна приводить к повторной отправке'
+        )
+        assert queue.qsize() == 0
+
+    def test_token_bucket(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=1, clock=lambda: now[0])
+        assert bucket.delay() == 0
+        bucket.consume()
+        assert bucket.delay() == 1
+        now[0] = 1.0
+        assert bucket.delay() == 0
+
+    def test_coalesce_respects_telegram_limit(self):
+        assert len(coalesce(['а' * 3000, 'б' * 3000])) == 2
@@ -0,0 +1,30 @@
+import requests
+
+import http_client
+
+
+class TestHttpClient:
+
+    def test_client_is_shared(self):
+        assert http_client.get_client() is http_client.get_client(), (
+            'Клиент должен создаваться один раз на процесс'
+        )
+
+    def test_timeouts_are_passed(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            requests.Session, 'get',
+            lambda session, url, **kwargs: calls.append(kwargs)
+        )
+        client = http_client.HttpClient(connect_timeout=1, read_timeout=2)
+        client.get('https://example.com')
+        client.get('https://example.com', timeout=5)
+        assert calls[0]['timeout'] == (1, 2), (
+            'Проверьте, что запросы выполняются с таймаутами'
+        )
+        assert calls[1]['timeout'] == 5
+
+    def test_pool_size(self):
+        client = http_client.HttpClient(pool_size=7)
+        adapter = client.session.get_adapter('https://practicum.yandex.ru')
+        assert adapter._pool_maxsize == 7
@@ -0,0 +1,137 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+import exceptions
+import ingest
+
+KEY = '0123456789abcdef'
+HOMEWORK = {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+
+
+@pytest.fixture
+def server():
+    received = []
+
+    def handle(key, answer):
+        if key != KEY:
+            raise LookupError(key)
+        received.append(answer)
+        return len(answer['homeworks'])
+
+    server = ingest.serve(handle, 0, secret='secret')
+    server.received = received
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def post(server, payload, key=KEY, secret='secret'):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{server.server_port}'
+        f'/subscriptions/{key}/homework_statuses',
+        data=json.dumps(payload).encode(),
+        headers={'Authorization': f'Bearer {secret}'},
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+class TestIngest:
+
+    def test_payload_shapes(self):
+        answer = {'homeworks': [HOMEWORK], 'current_date': 5}
+        assert ingest.as_answer(answer) is answer
+        assert ingest.as_answer([HOMEWORK]) == {'homeworks': [HOMEWORK]}
+        assert ingest.as_answer(HOMEWORK) == {'homeworks': [HOMEWORK]}
+        with pytest.raises(exceptions.UnexpectedType):
+            ingest.as_answer('approved')
+
+    def test_pushed_event_reaches_handler(self, server):
+        assert post(server, HOMEWORK) == (
+            200, {'ok': True, 'notifications': 1}
+        )
+        assert server.received == [{'homeworks': [HOMEWORK]}], (
+            'Событие должно передаваться в конвейер в форме ответа API'
+        )
+
+    def test_wrong_secret_is_rejected(self, server):
+        assert post(server, HOMEWORK, secret='guess')[0] == 401
+        assert not server.received
+
+    def test_unknown_subscription(self, server):
+        assert post(server, HOMEWORK, key='ffff')[0] == 404
+
+    def test_invalid_payload(self, server):
+        status, body = post(server, 'approved')
+        assert status == 400 and 'ожидался' in body['error'].lower()
+
+    def test_events_use_the_poll_pipeline(self, tmp_path):
+        import homework
+        import storage
+        from subscriptions import SubscriptionRegistry
+
+        class Delivery:
+            def __init__(self):
+                self.sent = []
+
+            def put(self, chat_id, text, on_sent=None, on_failed=None):
+                self.sent.append(text)
+                on_sent()
+
+        context = homework.BotContext(
+            None, storage.open_store('file', str(tmp_path / 'state.json'))
+        )
+        context.delivery = Delivery()
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token', 1)
+        subscription.current_date = 100
+        for _ in range(2):
+            homework.ingest_answer(
+                context, registry, subscription.key,
+                ingest.as_answer(dict(HOMEWORK)),
+            )
+        assert len(context.delivery.sent) == 1, (
+            'Повторное событие не должно приводить к повторной отправке'
+        )
+        assert context.scheduler.schedule_for(subscription.key).pushed
+        with pytest.raises(exceptions.MissingField):
+            homework.ingest_answer(
+                context, registry, subscription.key,
+                {'homeworks': [{'id': 2}]},
+            )
+
+    def test_repeated_push_before_send_is_sent_once(self, tmp_path):
+        import homework
+        import storage
+        from subscriptions import SubscriptionRegistry
+
+        sent = []
+
+        class Bot:
+            def send_message(self, chat_id, text):
+                sent.append(text)
+
+        context = homework.BotContext(
+            Bot(), storage.open_store('file', str(tmp_path / 'state.json'))
+        )
+        registry = SubscriptionRegistry()
+        subscription = registry.add('token', 1)
+        subscription.current_date = 100
+        for _ in range(2):
+            homework.ingest_answer(
+                context, registry, subscription.key,
+                ingest.as_answer(dict(HOMEWORK)),
+            )
+        context.delivery.flush()
+        assert sent == [homework.render_homework(
+            homework.validate_homework(HOMEWORK)
+        )], (
+            'Событие, пришедшее дважды до отправки, '
+            'должно отправляться один раз'
+        )
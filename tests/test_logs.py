@@ -0,0 +1,138 @@
+import io
+import json
+import logging
+import queue
+
+import pytest
+
+import logs
+
+
+def make_record(message, *args, level=logging.INFO, **extra):
+    record = logging.LogRecord(
+        'root', level, __file__, 1, message, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    root = logging.getLogger()
+    level = root.level
+    pipelines = []
+
+    def start(**options):
+        stream = io.StringIO()
+        started = logs.LogPipeline(
+            str(tmp_path / 'output.log'), stream=stream, **options
+        )
+        started.start()
+        pipelines.append(started)
+        return started, stream
+
+    yield start
+    for started in pipelines:
+        started.stop()
+        root.removeHandler(started.handler)
+    root.setLevel(level)
+
+
+class TestSampling:
+
+    def test_repeats_are_sampled_and_counted(self):
+        clock = FakeClock()
+        sampling = logs.SamplingFilter(interval=60, burst=2, clock=clock)
+        passed = [
+            sampling.filter(make_record('Нет домашних работ'))
+            for _ in range(5)
+        ]
+        assert passed == [True, True, False, False, False]
+        clock.now = 61
+        record = make_record('Нет домашних работ')
+        assert sampling.filter(record)
+        assert record.suppressed == 3, (
+            'Первое сообщение нового окна должно сообщать, '
+            'сколько повторов пропущено'
+        )
+
+    def test_different_arguments_are_different_messages(self):
+        sampling = logs.SamplingFilter(interval=60, burst=1,
+                                       clock=FakeClock())
+        assert sampling.filter(make_record('Отправлено "%s"', 'a'))
+        assert sampling.filter(make_record('Отправлено "%s"', 'b'))
+        assert not sampling.filter(make_record('Отправлено "%s"', 'a'))
+
+    def test_subscriptions_are_sampled_apart(self):
+        sampling = logs.SamplingFilter(interval=60, burst=1,
+                                       clock=FakeClock())
+        message = 'Успешно отправлено сообщение "%s"'
+        assert sampling.filter(make_record(message, 'a', subscription='1'))
+        assert sampling.filter(
+            make_record(message, 'a', subscription='2')
+        ), 'Одинаковые строки разных подписок не должны объединяться'
+        assert not sampling.filter(
+            make_record(message, 'a', subscription='1')
+        )
+
+    def test_warnings_are_never_sampled(self):
+        sampling = logs.SamplingFilter(interval=60, burst=1,
+                                       clock=FakeClock())
+        assert all(
+            sampling.filter(make_record('Сбой', level=logging.ERROR))
+            for _ in range(3)
+        )
+
+
+class TestPipeline:
+
+    def test_messages_are_formatted_by_the_writer(self, pipeline):
+        started, stream = pipeline()
+        record = make_record('Шард %d/%d', 1, 2)
+        started.handler.handle(record)
+        assert record.args == (1, 2), (
+            'Сообщение должно форматироваться в потоке записи, '
+            'а не в вызывающем'
+        )
+        started.stop()
+        assert 'Шард 1/2' in stream.getvalue()
+
+    def test_json_lines_carry_subscription_fields(self, pipeline, tmp_path):
+        started, _ = pipeline(json_lines=True)
+        logging.getLogger().info(
+            'Догоняем пропущенное с %s', 100,
+            extra={'subscription': 'abc', 'chat_id': 7},
+        )
+        started.stop()
+        entry = json.loads(
+            (tmp_path / 'output.log').read_text(encoding='utf-8')
+        )
+        assert entry['message'] == 'Догоняем пропущенное с 100'
+        assert entry['subscription'] == 'abc' and entry['chat_id'] == 7
+
+    def test_log_file_is_rotated_by_size(self, pipeline, tmp_path,
+                                         monkeypatch):
+        monkeypatch.setattr(logs, 'LOG_MAX_BYTES', 200)
+        started, _ = pipeline()
+        for number in range(20):
+            logging.getLogger().warning('Сообщение номер %d', number)
+        started.stop()
+        assert (tmp_path / 'output.log.1').exists(), (
+            'Лог должен ротироваться по размеру'
+        )
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = logs.PipelineHandler(queue.Queue(1))
+        dropped = logs.DROPPED.value()
+        handler.handle(make_record('первое'))
+        handler.handle(make_record('второе'))
+        assert logs.DROPPED.value() == dropped + 1
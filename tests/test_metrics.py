@@ -0,0 +1,54 @@
+import urllib.request
+
+import metrics
+
+
+class TestMetrics:
+
+    def test_histogram_render(self):
+        registry = metrics.Registry()
+        latency = registry.histogram(
+            'api_seconds', 'Latency.', buckets=(0.1, 1)
+        )
+
+        @latency.time()
+        def fast(value):
+            return value
+
+        assert fast(5) == 5
+        latency.observe(0.5)
+        text = registry.render()
+        assert 'api_seconds_bucket{le="0.1"} 1' in text
+        assert 'api_seconds_bucket{le="1"} 2' in text
+        assert 'api_seconds_bucket{le="+Inf"} 2' in text
+        assert 'api_seconds_count 2' in text
+
+    def test_counter_and_gauge_labels(self):
+        registry = metrics.Registry()
+        polls = registry.counter('polls_total', 'Polls.', ['result'])
+        polls.inc('ok')
+        polls.inc('ok')
+        registry.gauge('depth', 'Depth.', function=lambda: 7)
+        text = registry.render()
+        assert 'polls_total{result="ok"} 2' in text
+        assert 'depth 7' in text
+
+    def test_wrapped_function_keeps_signature(self):
+        import homework
+        from inspect import signature
+
+        assert len(signature(homework.parse_status).parameters) == 1, (
+            'Инструментирование не должно менять сигнатуру функций'
+        )
+
+    def test_http_endpoint(self):
+        registry = metrics.Registry()
+        registry.counter('polls_total', 'Polls.').inc()
+        server = metrics.serve(0, registry, host='127.0.0.1')
+        try:
+            url = f'http://127.0.0.1:{server.server_port}/metrics'
+            with urllib.request.urlopen(url) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+        assert 'polls_total 1' in body
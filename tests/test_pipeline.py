@@ -0,0 +1,263 @@
+import json
+
+import pytest
+
+import exceptions
+import homework
+import storage
+from subscriptions import Subscription, SubscriptionRegistry
+
+
+class Response:
+
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.content = json.dumps(payload).encode()
+
+
+class Upstream:
+    """Answers like homework_statuses: only works updated since from_date."""
+
+    def __init__(self, now, homeworks):
+        self.now = now
+        self.homeworks = homeworks
+
+    def answer(self, from_date):
+        return {
+            'current_date': self.now,
+            'homeworks': [
+                dict(homework, date_updated='2022-06-01T10:00:00Z')
+                for updated, homework in self.homeworks
+                if updated >= from_date
+            ],
+        }
+
+    def fetch(self, subscription):
+        return self.answer(subscription.current_date)
+
+    def get(self, url, stream=False, headers=None, params=None):
+        """Stand in for the HTTP client, behind the response cache."""
+        return Response(self.answer(params['from_date']))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    upstream = Upstream(240, [])
+    monkeypatch.setattr(homework, 'get_client', lambda: upstream)
+    monkeypatch.setattr(homework, 'STREAMING_AGE', float('inf'))
+    return upstream
+
+
+class Bot:
+
+    def __init__(self, failing=False, error=None):
+        self.failing = failing
+        self.error = error or ConnectionError('Telegram недоступен')
+        self.attempts = 0
+        self.sent = []
+        self.chats = []
+
+    def send_message(self, chat_id, text):
+        self.attempts += 1
+        if self.failing:
+            raise self.error
+        self.sent.append(text)
+        self.chats.append(chat_id)
+
+
+def open_context(bot, path):
+    return homework.BotContext(bot, storage.open_store('file', str(path)))
+
+
+class TestPipeline:
+
+    def test_cursor_waits_for_the_send(self, tmp_path):
+        upstream = Upstream(240, [(100, {
+            'id': 1, 'homework_name': 'hw', 'status': 'approved'
+        })])
+        context = open_context(Bot(), tmp_path / 'state.json')
+        subscription = Subscription('token', 1, current_date=50)
+        homework.poll_subscription(context, subscription, upstream.fetch)
+        assert subscription.current_date == 50, (
+            'Курсор не должен сдвигаться, пока изменение не отправлено'
+        )
+        context.finish_cycle()
+        context.store.close()
+
+        restarted = open_context(Bot(), tmp_path / 'state.json')
+        assert restarted.store.load_cursor(subscription.key) is None
+        subscription = Subscription('token', 1, current_date=50)
+        homework.poll_subscription(restarted, subscription, upstream.fetch)
+        restarted.delivery.flush()
+        assert len(restarted.bot.sent) == 1, (
+            'Изменение, не отправленное до перезапуска, '
+            'должно быть отправлено после него'
+        )
+        assert subscription.current_date == 240
+        assert restarted.store.load_cursor(subscription.key) == 240
+
+    def test_state_is_saved_when_the_queue_does_not_drain(self, tmp_path):
+        context = open_context(Bot(), tmp_path / 'state.json')
+        context.store.save_cursor('sub', 5)
+
+        class StuckDelivery:
+            def stop(self):
+                raise TimeoutError('очередь не опустела')
+
+        context.delivery = StuckDelivery()
+        try:
+            context.close()
+        except TimeoutError:
+            pass
+        reopened = open_context(Bot(), tmp_path / 'state.json')
+        assert reopened.store.load_cursor('sub') == 5, (
+            'Состояние должно сохраняться при остановке в любом случае'
+        )
+
+    def test_failed_send_is_found_again(self, tmp_path):
+        upstream = Upstream(240, [(100, {
+            'id': 1, 'homework_name': 'hw', 'status': 'approved'
+        })])
+        bot = Bot(failing=True)
+        context = open_context(bot, tmp_path / 'state.json')
+        subscription = Subscription('token', 1, current_date=50)
+        homework.poll_subscription(context, subscription, upstream.fetch)
+        context.delivery.flush()
+        assert context.delivery.qsize() == 0
+        assert subscription.current_date == 50, (
+            'После неудачной отправки курсор должен остаться на месте'
+        )
+        assert context.detector.known(subscription.key) == {}
+
+        bot.failing = False
+        homework.poll_subscription(context, subscription, upstream.fetch)
+        context.delivery.flush()
+        assert len(bot.sent) == 1, (
+            'Неотправленное изменение должно находиться следующим опросом'
+        )
+        assert context.detector.known(subscription.key) == {1: 'approved'}
+        assert subscription.current_date == 240
+
+    def test_blocked_chat_is_not_sent_again(self, tmp_path):
+        from telegram.error import Unauthorized
+
+        upstream = Upstream(240, [(100, {
+            'id': 1, 'homework_name': 'hw', 'status': 'approved'
+        })])
+        bot = Bot(failing=True, error=Unauthorized(
+            'Forbidden: bot was blocked by the user'
+        ))
+        context = open_context(bot, tmp_path / 'state.json')
+        subscription = Subscription('token', 1, current_date=50)
+        for _ in range(5):
+            homework.poll_subscription(context, subscription, upstream.fetch)
+            context.delivery.flush()
+        assert bot.attempts == 1, (
+            'Чат, который Telegram отвергает, не должен получать повторы'
+        )
+        assert context.detector.known(subscription.key) == {1: 'approved'}
+        assert subscription.current_date == 240
+
+    def test_unknown_status_does_not_hide_other_changes(self, tmp_path):
+        upstream = Upstream(240, [
+            (200, {'id': 2, 'homework_name': 'hw2', 'status': 'on_hold'}),
+            (100, {'id': 1, 'homework_name': 'hw1', 'status': 'approved'}),
+        ])
+        bot = Bot()
+        context = open_context(bot, tmp_path / 'state.json')
+        subscription = Subscription('token', 1, current_date=50)
+        homework.poll_subscription(context, subscription, upstream.fetch)
+        context.delivery.flush()
+        sent = '\n\n'.join(bot.sent)
+        assert 'on_hold' in sent, 'Неизвестный статус должен быть сообщён'
+        assert homework.HOMEWORK_VERDICTS['approved'] in sent, (
+            'Работа с известным статусом должна быть отправлена, '
+            'даже если рядом есть работа с неизвестным'
+        )
+        assert context.detector.known(subscription.key) == {1: 'approved'}
+        assert subscription.current_date == 240
+
+        upstream.now = 300
+        upstream.homeworks = []
+        homework.poll_subscription(context, subscription, upstream.fetch)
+        context.delivery.flush()
+        assert len(bot.sent) == 1, (
+            'После отправленных изменений не должно приходить '
+            '«Нет домашних работ»'
+        )
+
+    def test_empty_answer_is_not_announced_after_restart(self, tmp_path):
+        upstream = Upstream(240, [])
+        for attempt in range(2):
+            bot = Bot()
+            context = open_context(bot, tmp_path / 'state.json')
+            subscription = Subscription('token', 1, current_date=50)
+            homework.poll_subscription(context, subscription, upstream.fetch)
+            context.delivery.flush()
+            context.store.close()
+            assert len(bot.sent) == (1 - attempt), (
+                '«Нет домашних работ» должно отправляться только '
+                'при самом первом опросе, а не после каждого перезапуска'
+            )
+
+    def test_chats_sharing_a_token_each_see_a_change(self, api, tmp_path):
+        bot = Bot()
+        context = open_context(bot, tmp_path / 'state.json')
+        registry = SubscriptionRegistry()
+        for chat_id in ('chatA', 'chatB'):
+            registry.add('shared-token', chat_id).current_date = 50
+        for subscription in registry:
+            homework.poll_subscription(context, subscription)
+        api.now = 400
+        api.homeworks = [(300, {
+            'id': 1, 'homework_name': 'hw', 'status': 'approved'
+        })]
+        for subscription in registry:
+            homework.poll_subscription(context, subscription)
+        context.delivery.flush()
+        verdict = homework.HOMEWORK_VERDICTS['approved']
+        notified = [
+            chat_id for chat_id, text in zip(bot.chats, bot.sent)
+            if verdict in text
+        ]
+        assert sorted(notified) == ['chatA', 'chatB'], (
+            'Изменение должно дойти до каждого чата, '
+            'даже если у чатов общий токен'
+        )
+
+    def test_failed_send_is_found_again_behind_the_cache(self, api,
+                                                         tmp_path):
+        api.homeworks = [(100, {
+            'id': 1, 'homework_name': 'hw', 'status': 'approved'
+        })]
+        bot = Bot(failing=True)
+        context = open_context(bot, tmp_path / 'state.json')
+        subscription = Subscription('cached-token', 1, current_date=50)
+        homework.poll_subscription(context, subscription)
+        context.delivery.flush()
+        bot.failing = False
+        homework.poll_subscription(context, subscription)
+        context.delivery.flush()
+        assert len(bot.sent) == 1, (
+            'Повторный ответ API не должен скрывать изменение, '
+            'которое не удалось отправить'
+        )
+        assert subscription.current_date == 240
+
+    def test_oldest_success_skips_suspended(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(homework.LAST_SUCCESS, '_values', {})
+        context = homework.BotContext(
+            Bot(), storage.open_store('file', str(tmp_path / 'state.json')),
+            clock=lambda: 1000,
+        )
+        homework.LAST_SUCCESS.set(900, 'active')
+        homework.LAST_SUCCESS.set(100, 'revoked')
+        context.scheduler.record_failure(
+            'revoked', exceptions.AuthRevoked('401')
+        )
+        assert context.oldest_success_age() == 100, (
+            'Приостановленные подписки не должны учитываться в возрасте '
+            'последнего успешного опроса'
+        )
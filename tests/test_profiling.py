@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+import profiling
+
+
+def busy(stopping):
+    while not stopping.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def session(tmp_path):
+    yield profiling.start(directory=str(tmp_path), interval=0.001)
+    profiling.stop()
+
+
+class TestProfiling:
+
+    def test_session_writes_reports(self, session, tmp_path):
+        stopping = threading.Event()
+        worker = threading.Thread(target=busy, args=(stopping,),
+                                  name='poller')
+        worker.start()
+        step = profiling.timed('check_response')(lambda: [0] * 1000)
+        for _ in range(3):
+            step()
+        time.sleep(0.05)
+        stopping.set()
+        worker.join()
+        reports = profiling.stop()['reports']
+        stacks = open(reports['stacks'], encoding='utf-8').read()
+        assert 'poller;' in stacks and 'test_profiling:busy' in stacks, (
+            'Профиль должен содержать стеки всех потоков'
+        )
+        timings = json.load(open(reports['timings'], encoding='utf-8'))
+        assert timings['steps']['check_response']['calls'] == 3
+        assert 'memory' in reports
+
+    def test_steps_are_not_timed_without_session(self):
+        calls = []
+        step = profiling.timed('parse_status')(lambda: calls.append(1))
+        step()
+        assert calls == [1] and profiling._session is None
+
+    def test_toggle(self, tmp_path):
+        assert profiling.start(directory=str(tmp_path))['running']
+        result = profiling.toggle()
+        assert not result['running'] and 'stacks' in result['reports']
+
+    def test_admin_actions_need_secret(self):
+        registry = metrics.Registry()
+        actions = {'/debug/ping': lambda: {'ok': True}}
+        server = metrics.serve(0, registry, host='127.0.0.1',
+                               actions=actions, secret='secret')
+        url = f'http://127.0.0.1:{server.server_port}/debug/ping'
+        try:
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(urllib.request.Request(
+                    url, method='POST'
+                ))
+            assert error.value.code == 403
+            request = urllib.request.Request(
+                url, method='POST',
+                headers={'Authorization': 'Bearer secret'},
+            )
+            with urllib.request.urlopen(request) as response:
+                assert json.load(response) == {'ok': True}
+        finally:
+            server.shutdown()
@@ -0,0 +1,50 @@
+import json
+
+from response_cache import ResponseCache, fresh_homeworks
+
+
+class FakeResponse:
+
+    def __init__(self, payload, headers=None):
+        self.content = json.dumps(payload).encode()
+        self.headers = headers or {}
+
+
+class TestResponseCache:
+
+    def test_same_homeworks_skip_decoding(self):
+        cache = ResponseCache()
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        first = cache.decode('token', 1, FakeResponse(
+            {'homeworks': homeworks, 'current_date': 10}
+        ))
+        second = cache.decode('token', 10, FakeResponse(
+            {'homeworks': homeworks, 'current_date': 20}
+        ))
+        assert fresh_homeworks(first) == homeworks
+        assert second['current_date'] == 20, (
+            'Курсор должен обновляться и при совпадении ответа'
+        )
+        assert fresh_homeworks(second) == [], (
+            'Повторный ответ не должен обрабатываться заново'
+        )
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'revalidated': 0}
+
+    def test_other_token_is_a_miss(self):
+        cache = ResponseCache()
+        payload = {'homeworks': [], 'current_date': 10}
+        cache.decode('a', 1, FakeResponse(payload))
+        cache.decode('b', 1, FakeResponse(payload))
+        assert cache.stats()['misses'] == 2
+
+    def test_validators_sent_for_same_from_date(self):
+        cache = ResponseCache()
+        cache.decode('token', 1, FakeResponse(
+            {'homeworks': [], 'current_date': 10}, {'ETag': '"v1"'}
+        ))
+        assert cache.conditional_headers('token', 1) == {
+            'If-None-Match': '"v1"'
+        }
+        assert cache.conditional_headers('token', 10) == {}
+        answer = cache.not_modified('token', 1)
+        assert fresh_homeworks(answer) == []
@@ -0,0 +1,94 @@
+import exceptions
+from scheduler import AdaptiveScheduler, parse_retry_after
+from subscriptions import SubscriptionRegistry
+
+
+def make_scheduler():
+    return AdaptiveScheduler(
+        min_interval=6, max_interval=600, jitter=0, rng=lambda: 0.5
+    )
+
+
+class TestAdaptiveScheduler:
+
+    def test_idle_backs_off_to_max(self):
+        scheduler = make_scheduler()
+        delays = [scheduler.record_success('a', [], now=0) for _ in range(10)]
+        assert delays[:3] == [12, 24, 48], (
+            'При пустом ответе интервал должен расти экспоненциально'
+        )
+        assert delays[-1] == 600
+
+    def test_reviewing_keeps_fast_polling(self):
+        scheduler = make_scheduler()
+        scheduler.record_success('a', [], now=0)
+        scheduler.record_success('a', [{'status': 'reviewing'}], now=0)
+        assert scheduler.record_success('a', [], now=0) == 6, (
+            'Пока работа на проверке, опрос должен оставаться частым'
+        )
+        scheduler.record_success('a', [{'status': 'approved'}], now=0)
+        assert scheduler.record_success('a', [], now=0) == 12
+
+    def test_failure_respects_retry_after(self):
+        scheduler = make_scheduler()
+        assert scheduler.record_failure('a', ValueError(), now=0) == 12
+        error = exceptions.RateLimited('429', retry_after=300)
+        assert scheduler.record_failure('a', error, now=0) == 300
+
+    def test_transient_errors_back_off(self):
+        scheduler = make_scheduler()
+        error = exceptions.TransientNetworkError('таймаут')
+        delays = [
+            scheduler.record_failure('a', error, now=0) for _ in range(3)
+        ]
+        assert delays == [12, 24, 48]
+
+    def test_long_outage_does_not_overflow(self):
+        scheduler = make_scheduler()
+        error = exceptions.TransientNetworkError('таймаут')
+        for _ in range(2000):
+            delay = scheduler.record_failure('a', error, now=0)
+        assert delay == 600, (
+            'Долгий сбой не должен переполнять расчёт интервала'
+        )
+
+    def test_permanent_errors_poll_slowly(self):
+        scheduler = make_scheduler()
+        for error in (exceptions.MissingField('homeworks'),
+                      exceptions.UnknownStatus('unknown')):
+            assert scheduler.record_failure('a', error, now=0) == 600, (
+                'Повтор не исправит ошибку формата: опрашивать редко'
+            )
+
+    def test_revoked_token_suspends_subscription(self):
+        scheduler = make_scheduler()
+        registry = SubscriptionRegistry()
+        dead = registry.add('dead', 1)
+        alive = registry.add('alive', 2)
+        scheduler.record_failure(dead.key, exceptions.AuthRevoked('401'), 0)
+        scheduler.record_success(alive.key, [], now=0)
+        assert scheduler.due(registry, now=10 ** 9) == [alive], (
+            'Подписка с отозванным токеном не должна опрашиваться'
+        )
+        assert scheduler.next_deadline(registry) == 12
+        scheduler.resume(dead.key, now=0)
+        assert dead in scheduler.due(registry, now=0)
+
+    def test_pushed_subscription_polls_slowly(self):
+        scheduler = make_scheduler()
+        assert scheduler.record_push('a', now=0) == 600
+        assert scheduler.record_success(
+            'a', [{'status': 'reviewing'}], now=0
+        ) == 600, 'Подписку с push-событиями достаточно изредка проверять'
+
+    def test_jitter_stays_within_bounds(self):
+        scheduler = AdaptiveScheduler(
+            min_interval=6, max_interval=600, jitter=0.5, rng=lambda: 0
+        )
+        assert scheduler.record_success('a', [{'status': 'x'}], now=0) == 6
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after('120') == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after('garbage') is None
+        assert parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
@@ -0,0 +1,77 @@
+import json
+import timeit
+
+import pytest
+
+import exceptions
+import schema
+
+HOMEWORK = {
+    'id': 123,
+    'status': 'approved',
+    'homework_name': 'hw123',
+    'reviewer_comment': 'Всё отлично' * 20,
+    'date_updated': '2022-01-01T00:00:00Z',
+    'lesson_name': 'Итоговый проект',
+}
+
+
+class TestSchema:
+
+    def test_valid_answer_becomes_slotted_records(self):
+        answer = schema.validate_answer(
+            {'homeworks': [HOMEWORK], 'current_date': 42}
+        )
+        homework = answer.homeworks[0]
+        assert answer.current_date == 42
+        assert homework.status == 'approved'
+        assert homework['homework_name'] == 'hw123'
+        assert not hasattr(homework, '__dict__'), (
+            'Запись должна хранить только объявленные поля'
+        )
+
+    def test_optional_fields(self):
+        homework = schema.validate_homework(
+            {'homework_name': 'hw', 'status': 'reviewing'}
+        )
+        assert homework.id is None
+        assert homework.get('id', 'hw') == 'hw'
+
+    @pytest.mark.parametrize('data, error, text', [
+        ([], exceptions.UnexpectedType, 'ответ'),
+        ({'homeworks': []}, exceptions.MissingField, 'current_date'),
+        ({'homeworks': {}, 'current_date': 1},
+         exceptions.UnexpectedType, 'homeworks: ожидался list'),
+        ({'homeworks': [], 'current_date': '1'},
+         exceptions.UnexpectedType, 'current_date'),
+        ({'homeworks': [], 'current_date': True},
+         exceptions.UnexpectedType, 'получен bool'),
+        ({'homeworks': [HOMEWORK, 'hw'], 'current_date': 1},
+         exceptions.UnexpectedType, 'homeworks[1]: ожидался объект'),
+        ({'homeworks': [HOMEWORK, {'homework_name': 'hw'}],
+          'current_date': 1},
+         exceptions.MissingField, 'homeworks[1].status'),
+        ({'homeworks': [dict(HOMEWORK, id='1')], 'current_date': 1},
+         exceptions.UnexpectedType, 'homeworks[0].id'),
+    ])
+    def test_precise_errors(self, data, error, text):
+        with pytest.raises(error) as info:
+            schema.validate_answer(data)
+        assert text in str(info.value), (
+            'Сообщение об ошибке должно указывать на поле'
+        )
+
+    def test_validation_is_cheaper_than_decoding(self):
+        body = json.dumps(
+            {'homeworks': [HOMEWORK] * 200, 'current_date': 1}
+        )
+        data = json.loads(body)
+        decoding = min(timeit.repeat(
+            lambda: json.loads(body), number=50, repeat=3
+        ))
+        validation = min(timeit.repeat(
+            lambda: schema.validate_answer(data), number=50, repeat=3
+        ))
+        assert validation < decoding, (
+            'Проверка ответа должна стоить меньше разбора JSON'
+        )
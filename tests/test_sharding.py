@@ -0,0 +1,93 @@
+import signal
+
+import pytest
+
+from sharding import HashRing, select_shard, shard_from_env, worker_shard
+from subscriptions import SubscriptionRegistry
+
+
+def make_registry(count):
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token{number}', number)
+    return registry
+
+
+class TestSharding:
+
+    def test_every_subscription_has_exactly_one_shard(self):
+        shards = [select_shard(make_registry(500), index, 4)
+                  for index in range(4)]
+        keys = [item.key for shard in shards for item in shard]
+        assert len(keys) == len(set(keys)) == 500, (
+            'Каждая подписка должна опрашиваться ровно одним воркером'
+        )
+        assert all(len(shard) > 60 for shard in shards)
+
+    def test_workers_of_every_dyno_cover_each_subscription_once(self):
+        dynos, workers = 3, 2
+        keys = [
+            item.key
+            for dyno in range(dynos)
+            for worker in range(workers)
+            for item in select_shard(
+                make_registry(500),
+                *worker_shard(dyno, dynos, worker, workers),
+            )
+        ]
+        assert len(keys) == len(set(keys)) == 500, (
+            'Воркеры всех дайно вместе должны опрашивать каждую подписку '
+            'ровно один раз'
+        )
+
+    def test_adding_worker_moves_small_share(self):
+        keys = [f'key{number}' for number in range(5000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = sum(
+            before.node_for(key) != after.node_for(key) for key in keys
+        )
+        assert moved / len(keys) < 0.3, (
+            'При добавлении воркера должна переезжать примерно 1/N подписок'
+        )
+
+    def test_shard_from_env(self):
+        assert shard_from_env({}) == (0, 1)
+        assert shard_from_env({'SHARD_COUNT': '3', 'DYNO': 'worker.2'}) == (
+            1, 3
+        )
+        assert shard_from_env(
+            {'SHARD_COUNT': '3', 'SHARD_INDEX': '2'}
+        ) == (2, 3)
+        with pytest.raises(ValueError):
+            shard_from_env({'SHARD_COUNT': '2', 'SHARD_INDEX': '2'})
+
+    def test_forked_worker_drops_supervisor_handlers(self, monkeypatch):
+        import homework
+
+        handlers = {}
+
+        def run_worker(shard_index, shard_count):
+            handlers.update(
+                (signum, signal.getsignal(signum))
+                for signum in (signal.SIGTERM, signal.SIGINT)
+            )
+
+        monkeypatch.setattr(homework, 'run_worker', run_worker)
+        monkeypatch.setattr(homework.logs, 'reopen', lambda name: None)
+        monkeypatch.setattr(homework.logs, 'shutdown', lambda: None)
+        saved = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1)
+        }
+        for signum in saved:
+            signal.signal(signum, lambda *args: None)
+        try:
+            homework.run_forked_worker(0, 1, 0, 2)
+        finally:
+            for signum, handler in saved.items():
+                signal.signal(signum, handler)
+        assert handlers == {
+            signal.SIGTERM: signal.SIG_DFL,
+            signal.SIGINT: signal.default_int_handler,
+        }, 'Воркер не должен наследовать обработчики сигналов супервизора'
@@ -0,0 +1,54 @@
+import homework
+import storage
+from clock import SimulatedClock
+from scheduler import AdaptiveScheduler
+from simulation import DAY, SimulatedUpstream
+from subscriptions import SubscriptionRegistry
+
+START = 1_700_000_000
+
+
+def make_registry(count):
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token-{number}', number)
+    return registry
+
+
+def run(days, subscriptions=5, seed=0):
+    clock = SimulatedClock(START, until=START + days * DAY)
+    upstream = SimulatedUpstream(clock, change_interval=DAY / 4, seed=seed)
+    homework.simulate(
+        make_registry(subscriptions), upstream, clock,
+        storage.open_store('memory'), seed=seed,
+    )
+    return upstream.stats(subscriptions)
+
+
+class TestSimulation:
+
+    def test_every_change_is_noticed_within_max_interval(self):
+        stats = run(days=1)
+        assert stats['changes'] > 0
+        assert stats['noticed'] >= stats['changes'] * 0.9
+        assert stats['delay_max'] <= AdaptiveScheduler().max_interval * 1.1, (
+            'Изменение должно замечаться не позже максимального интервала'
+        )
+
+    def test_runs_repeat_exactly(self):
+        assert run(days=0.5, seed=3) == run(days=0.5, seed=3), (
+            'Симуляция с одним seed должна давать одинаковый результат'
+        )
+
+    def test_sync_loop_reads_the_injected_clock(self):
+        clock = SimulatedClock(START, until=START + 3600)
+        upstream = SimulatedUpstream(clock)
+        context = homework.BotContext(
+            None, storage.open_store('memory'), clock
+        )
+        registry = make_registry(1)
+        homework.run_sync(context, registry, upstream.fetch)
+        assert clock() == START + 3600
+        assert upstream.polls > 1, (
+            'Цикл опроса должен идти по внедрённым часам, а не по time.time'
+        )
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'benchmarks'))
+
+import startup  # noqa: E402
+
+IMPORT_TO_FIRST_POLL_BUDGET = 1.0
+
+
+@pytest.fixture(scope='module')
+def cold_start(tmp_path_factory):
+    process, endpoint = startup.start_fake_api()
+    try:
+        yield startup.measure(
+            endpoint, str(tmp_path_factory.mktemp('state') / 'state.db')
+        )
+    finally:
+        process.terminate()
+
+
+class TestStartup:
+
+    def test_heavy_modules_are_not_imported(self, cold_start):
+        assert cold_start['heavy_modules_at_import'] == [], (
+            'Импорт homework не должен тянуть telegram, requests, asyncio '
+            'и dotenv: они нужны только при первом использовании'
+        )
+
+    def test_first_poll_within_budget(self, cold_start):
+        assert cold_start['first_poll'] < IMPORT_TO_FIRST_POLL_BUDGET, (
+            'От импорта до первого опроса должно проходить не больше '
+            f'{IMPORT_TO_FIRST_POLL_BUDGET} с'
+        )
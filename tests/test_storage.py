@@ -0,0 +1,71 @@
+import pytest
+
+import storage
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def store_path(request, tmp_path):
+    suffix = {'sqlite': 'state.sqlite3', 'file': 'state.json'}
+    return request.param, str(tmp_path / suffix[request.param])
+
+
+class TestStateStore:
+
+    def test_state_survives_restart(self, store_path):
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        store.save_cursor('sub', 1000)
+        store.save_status('sub', 123, 'approved', '2020-02-13T14:40:57Z')
+        store.close()
+
+        reopened = storage.open_store(backend, path)
+        assert reopened.load_cursor('sub') == 1000, (
+            'Курсор `current_date` должен сохраняться между перезапусками'
+        )
+        assert reopened.last_status('sub', 123) == 'approved'
+        assert reopened.statuses('sub') == {123: 'approved'}, (
+            'Числовые id работ должны восстанавливаться как int'
+        )
+        reopened.close()
+
+    def test_statuses_are_interned(self, store_path):
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        for number in range(3):
+            store.save_status(
+                f'sub{number}', number, ''.join(['appr', 'oved']), None
+            )
+        store.close()
+        reopened = storage.open_store(backend, path)
+        statuses = [reopened.last_status(f'sub{n}', n) for n in range(3)]
+        assert statuses[0] is statuses[1] is statuses[2], (
+            'Одинаковые статусы должны храниться одной строкой'
+        )
+        reopened.close()
+
+    def test_pending_changes_are_visible_before_flush(self, store_path):
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        store.save_cursor('sub', 5)
+        assert store.load_cursor('sub') == 5
+        assert storage.open_store(backend, path).load_cursor('sub') is None
+        store.close()
+
+    def test_flush_writes_once_per_batch(self, store_path, monkeypatch):
+        backend, path = store_path
+        store = storage.open_store(backend, path)
+        writes = []
+        original = store._write
+        monkeypatch.setattr(
+            store, '_write',
+            lambda *args: writes.append(args) or original(*args)
+        )
+        for number in range(100):
+            store.save_cursor(f'sub{number}', number)
+            store.save_status(f'sub{number}', 1, 'reviewing', None)
+        store.flush()
+        store.flush()
+        assert len(writes) == 1, (
+            'Все изменения цикла опроса должны записываться одним пакетом'
+        )
+        store.close()
@@ -0,0 +1,106 @@
+import json
+import tracemalloc
+
+import pytest
+
+import exceptions
+from streaming_json import iter_answer
+
+
+def chunked(data, size):
+    return (data[start:start + size] for start in range(0, len(data), size))
+
+
+def parse(data, size):
+    envelope = {}
+    homeworks = list(iter_answer(chunked(data, size), envelope))
+    return homeworks, envelope
+
+
+class TestStreamingJson:
+    ANSWER = {
+        'current_date': 1655000000,
+        'homeworks': [
+            {'id': 2, 'status': 'approved', 'homework_name': 'Ёжик "2"',
+             'reviewer_comment': 'Всё нравится', 'date_updated': 'x'},
+            {'id': 1, 'status': 'rejected', 'homework_name': 'hw1',
+             'reviewer_comment': '', 'date_updated': 'y'},
+        ],
+    }
+
+    def test_every_chunk_border(self):
+        data = json.dumps(self.ANSWER, ensure_ascii=False, indent=1).encode()
+        for size in range(1, 40):
+            homeworks, envelope = parse(data, size)
+            assert homeworks == self.ANSWER['homeworks'], (
+                'Разбор не должен зависеть от границ фрагментов ответа'
+            )
+            assert envelope == {'current_date': 1655000000, 'homeworks': True}
+
+    def test_homeworks_not_a_list_go_to_envelope(self):
+        data = json.dumps({'homeworks': {'id': 1}}).encode()
+        homeworks, envelope = parse(data, 4)
+        assert homeworks == []
+        assert envelope == {'homeworks': {'id': 1}}
+
+    def test_truncated_body_fails(self):
+        data = json.dumps(self.ANSWER).encode()[:-10]
+        with pytest.raises(exceptions.SomethingWentWrong):
+            parse(data, 16)
+
+    def test_memory_does_not_grow_with_history(self):
+        record = {'id': 0, 'status': 'approved', 'homework_name': 'hw',
+                  'reviewer_comment': 'к' * 500, 'date_updated': 'x'}
+
+        def body(count):
+            yield b'{"homeworks": ['
+            for number in range(count):
+                prefix = b',' if number else b''
+                yield prefix + json.dumps(record).encode()
+            yield b'], "current_date": 1}'
+
+        def peak(count):
+            tracemalloc.start()
+            for _ in iter_answer(body(count), {}):
+                pass
+            result = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return result
+
+        assert peak(5000) < 2 * peak(100) + 64 * 1024, (
+            'Пиковая память не должна расти с длиной истории'
+        )
+
+    def test_known_works_in_a_stream_are_not_an_empty_answer(self, tmp_path):
+        import homework
+        import storage
+        from streaming_json import StreamedAnswer
+        from subscriptions import Subscription
+
+        class Response:
+            def __init__(self, data):
+                self.data = data
+
+            def iter_content(self, size):
+                return chunked(self.data, size)
+
+            def close(self):
+                pass
+
+        data = json.dumps(self.ANSWER, ensure_ascii=False).encode()
+        context = homework.BotContext(
+            None, storage.open_store('file', str(tmp_path / 'state.json'))
+        )
+        subscription = Subscription('token', 1, current_date=0)
+        first = homework.build_notifications(
+            context, subscription, StreamedAnswer(Response(data))
+        )
+        for notification in first:
+            homework.commit_change(
+                context, subscription, notification.homework
+            )
+        assert homework.build_notifications(
+            context, subscription, StreamedAnswer(Response(data))
+        ) == [], (
+            'Поток из уже известных работ не должен считаться пустым ответом'
+        )
@@ -0,0 +1,34 @@
+import json
+
+from subscriptions import SubscriptionRegistry
+
+
+class TestSubscriptionRegistry:
+
+    def test_same_pair_registered_once(self):
+        registry = SubscriptionRegistry()
+        first = registry.add('token', 1)
+        second = registry.add('token', 1)
+        assert first is second, (
+            'Повторная регистрация пары токен/чат не должна создавать '
+            'новую подписку'
+        )
+        assert len(registry) == 1
+
+    def test_key_does_not_expose_token(self):
+        registry = SubscriptionRegistry()
+        subscription = registry.add('secret-token', 1)
+        assert 'secret-token' not in subscription.key
+        assert 'secret-token' not in repr(subscription)
+
+    def test_load_from_file(self, tmp_path):
+        path = tmp_path / 'subscriptions.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'a', 'chat_id': 1},
+            {'practicum_token': 'b', 'chat_id': 2},
+            {'practicum_token': 'a', 'chat_id': 3},
+        ]))
+        registry = SubscriptionRegistry()
+        registry.load(path)
+        assert len(registry) == 3
+        assert {item.chat_id for item in registry} == {1, 2, 3}
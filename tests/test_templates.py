@@ -0,0 +1,65 @@
+import pytest
+
+import exceptions
+from templates import Templates
+
+CONFIG = {
+    'ru': {
+        'status_changed': 'Работа "{homework_name}": {verdict}',
+        'failure': 'Сбой: {error}',
+        'verdicts': {'approved': 'принята', 'on_hold': 'отложена'},
+    },
+    'en': {
+        'status_changed': '"{homework_name}": {verdict}',
+        'failure': 'Failure: {error}',
+        'verdicts': {'approved': 'approved'},
+    },
+}
+
+
+class TestTemplates:
+
+    def test_new_status_from_config(self):
+        templates = Templates(CONFIG, default_locale='ru')
+        assert templates.render_status('hw', 'on_hold') == (
+            'Работа "hw": отложена'
+        ), 'Новые статусы должны добавляться без изменения кода'
+
+    def test_locales_and_fallback(self):
+        templates = Templates(CONFIG, default_locale='ru')
+        assert templates.render_status('hw', 'approved', 'en') == (
+            '"hw": approved'
+        )
+        assert templates.render_status('hw', 'approved', 'de') == (
+            'Работа "hw": принята'
+        )
+        assert templates.text('failure', 'en', error=42) == 'Failure: 42'
+
+    def test_unknown_status_raises(self):
+        templates = Templates(CONFIG)
+        with pytest.raises(exceptions.UnknownStatus) as info:
+            templates.render_status('hw', 'unknown')
+        assert isinstance(info.value, KeyError)
+
+    def test_render_is_cached(self):
+        templates = Templates(CONFIG)
+        for _ in range(100):
+            templates.render_status('hw', 'approved', 'ru')
+        info = templates.render_status.cache_info()
+        assert info.misses == 1 and info.hits == 99, (
+            'Одинаковые сообщения должны формироваться один раз'
+        )
+
+    def test_braces_in_verdict_are_literal(self):
+        config = {'ru': {
+            'status_changed': '{homework_name} {verdict}',
+            'verdicts': {'approved': '{ок}'},
+        }}
+        assert Templates(config).render_status('hw', 'approved') == 'hw {ок}'
+
+    def test_bundled_messages_match_verdicts(self):
+        import homework
+
+        assert set(homework.HOMEWORK_VERDICTS) == {
+            'approved', 'reviewing', 'rejected'
+        }
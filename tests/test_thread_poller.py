@@ -0,0 +1,89 @@
+import threading
+import time
+
+from scheduler import AdaptiveScheduler
+from subscriptions import SubscriptionRegistry
+from thread_poller import ThreadPoller
+
+
+def make_registry(count):
+    registry = SubscriptionRegistry()
+    for number in range(count):
+        registry.add(f'token{number}', number)
+    return registry
+
+
+class TestThreadPoller:
+
+    def test_polls_run_in_parallel(self):
+        polled = []
+        poller = ThreadPoller(
+            poll=lambda subscription: time.sleep(0.05) or polled.append(1),
+            scheduler=AdaptiveScheduler(), after_cycle=lambda: None,
+            workers=20,
+        )
+        started = time.monotonic()
+        poller.run_cycle(make_registry(20))
+        assert time.monotonic() - started < 0.5, (
+            'Опросы должны выполняться пулом потоков параллельно'
+        )
+        assert len(polled) == 20
+
+    def test_late_poll_is_not_resubmitted(self):
+        release = threading.Event()
+        calls = []
+
+        def poll(subscription):
+            calls.append(subscription.key)
+            release.wait(2)
+
+        poller = ThreadPoller(
+            poll=poll, scheduler=AdaptiveScheduler(),
+            after_cycle=lambda: None, deadline=0.01,
+        )
+        registry = make_registry(1)
+        poller.run_cycle(registry)
+        poller.run_cycle(registry)
+        release.set()
+        assert len(calls) == 1, (
+            'Подписка не должна опрашиваться, пока не завершён её опрос'
+        )
+
+    def test_stop_waits_for_in_flight_polls(self):
+        stopping = threading.Event()
+        finished = []
+        saved = []
+
+        def poll(subscription):
+            stopping.set()
+            time.sleep(0.05)
+            finished.append(subscription.key)
+
+        poller = ThreadPoller(
+            poll=poll, scheduler=AdaptiveScheduler(),
+            after_cycle=lambda: saved.append(len(finished)),
+            stopping=stopping, deadline=0,
+        )
+        poller.run_forever(make_registry(3))
+        assert len(finished) == 3
+        assert saved[-1] == 3, (
+            'Курсоры должны сохраняться после завершения начатых опросов'
+        )
+
+    def test_late_poll_does_not_spin_the_loop(self):
+        stopping = threading.Event()
+        cycles = []
+
+        def poll(subscription):
+            time.sleep(0.2)
+            stopping.set()
+
+        poller = ThreadPoller(
+            poll=poll, scheduler=AdaptiveScheduler(),
+            after_cycle=lambda: cycles.append(1),
+            stopping=stopping, deadline=0.01,
+        )
+        poller.run_forever(make_registry(1))
+        assert len(cycles) <= 3, (
+            'Опоздавший опрос не должен заставлять цикл крутиться вхолостую'
+        )
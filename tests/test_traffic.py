@@ -0,0 +1,103 @@
+import gzip
+
+import exceptions
+import homework
+import storage
+import traffic
+from subscriptions import Subscription
+
+TOKEN = 'y0_AgAAAAsecret'
+HOMEWORK = {
+    'id': 1, 'homework_name': 'hw-1', 'status': 'approved',
+    'date_updated': '2022-01-01T00:00:00Z',
+}
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def record(path, *calls):
+    traffic.start_recording(str(path), [TOKEN])
+    try:
+        for call in calls:
+            call()
+    finally:
+        traffic.stop_recording()
+
+
+class TestTraffic:
+
+    def test_trace_is_compressed_and_redacted(self, tmp_path):
+        path = tmp_path / 'trace.jsonl.gz'
+        subscription = Subscription(TOKEN, 12345)
+        answer = {
+            'current_date': 100,
+            'homeworks': [dict(HOMEWORK, reviewer_comment=TOKEN)],
+        }
+        record(
+            path,
+            lambda: traffic.record_answer(subscription, 50, answer),
+            lambda: traffic.record_send(12345, 'текст', 0.1),
+        )
+        text = gzip.open(path, 'rt', encoding='utf-8').read()
+        assert TOKEN not in text and '12345' not in text, (
+            'В трассу не должны попадать токены и id чатов'
+        )
+        events = list(traffic.read_trace(path))
+        assert [event['kind'] for event in events] == ['answer', 'send']
+        assert events[0]['subscription'] == subscription.key
+        assert events[0]['answer']['homeworks'][0]['status'] == 'approved'
+
+    def test_replay_keeps_recorded_pace(self, tmp_path):
+        path = tmp_path / 'trace.jsonl.gz'
+        clock = FakeClock()
+        recorder = traffic.TraceRecorder(str(path), clock=clock)
+        for moment in (0, 1, 3):
+            clock.now = moment
+            recorder.write('send', chat='c', text='t', seconds=0)
+        recorder.close()
+        replay_clock = FakeClock()
+        counts = traffic.replay(
+            str(path), {}, speed=2, clock=replay_clock,
+            sleep=replay_clock.sleep,
+        )
+        assert counts == {'send': 3}
+        assert replay_clock.sleeps == [0.5, 1.0], (
+            'При speed=2 промежутки между событиями должны сократиться вдвое'
+        )
+
+    def test_replay_runs_the_pipeline(self, tmp_path):
+        path = tmp_path / 'trace.jsonl.gz'
+        subscription = Subscription(TOKEN, 1)
+        answer = {'current_date': 100, 'homeworks': [HOMEWORK]}
+        record(
+            path,
+            lambda: traffic.record_answer(subscription, 50, answer),
+            lambda: traffic.record_answer(subscription, 100, answer),
+            lambda: traffic.record_error(
+                subscription, exceptions.AuthRevoked('Токен отклонён')
+            ),
+        )
+        bot = traffic.ReplayBot()
+        result = homework.replay_trace(
+            str(path), storage.open_store('file', str(tmp_path / 's.json')),
+            bot,
+        )
+        assert result['events'] == {'answer': 2, 'error': 1}
+        texts = [text for _, text in bot.sent]
+        assert len(texts) == 2, (
+            'Повторный ответ не должен давать повторного уведомления'
+        )
+        assert 'hw-1' in texts[0]
+        assert texts[1] == homework.TEMPLATES.text('auth_revoked')
@@ -0,0 +1,74 @@
+"""Thread-pool execution mode for the synchronous poll path."""
+import concurrent.futures
+import logging
+import os
+import threading
+
+POLL_WORKERS = int(os.getenv('POLL_WORKERS', 16))
+POLL_DEADLINE = float(os.getenv('POLL_DEADLINE', 30))
+
+
+class ThreadPoller:
+    """Runs per-subscription polls on a sized pool of worker threads.
+
+    `poll` is the whole blocking pipeline for one subscription. A poll that
+    misses its deadline is left to finish on its own, but the subscription
+    is not submitted again until it does, so no token is polled twice at
+    once. `stopping` ends the loop; in-flight polls are always waited for
+    and `after_cycle` runs last, so cursors are saved on shutdown.
+    """
+
+    def __init__(self, poll, scheduler, after_cycle, stopping=None,
+                 workers=POLL_WORKERS, deadline=POLL_DEADLINE):
+        """Create the pool of `workers` poll threads."""
+        self.poll = poll
+        self.scheduler = scheduler
+        self.after_cycle = after_cycle
+        self.stopping = stopping or threading.Event()
+        self.workers = workers
+        self.deadline = deadline
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='poll'
+        )
+        self._in_flight = {}
+
+    def run_cycle(self, subscriptions):
+        """Poll subscriptions on the pool and wait up to the deadline."""
+        futures = []
+        for subscription in subscriptions:
+            if subscription.key in self._in_flight:
+                continue
+            future = self._executor.submit(self.poll, subscription)
+            self._in_flight[subscription.key] = future
+            future.add_done_callback(
+                lambda done, key=subscription.key: self._in_flight.pop(
+                    key, None
+                )
+            )
+            futures.append(future)
+        if not futures:
+            return
+        _, late = concurrent.futures.wait(futures, timeout=self.deadline)
+        if late:
+            logging.warning(
+                'Не уложились в %s с опросов: %d', self.deadline, len(late)
+            )
+
+    def run_forever(self, subscriptions):
+        """Poll due subscriptions until `stopping` is set."""
+        logging.info('Режим пула потоков, потоков: %d', self.workers)
+        try:
+            while not self.stopping.is_set():
+                self.run_cycle(self.scheduler.due(subscriptions))
+                self.after_cycle()
+                # A late poll is still due, but will not be submitted again
+                # until it ends: waiting for it would spin the loop.
+                deadline = self.scheduler.next_deadline([
+                    subscription for subscription in subscriptions
+                    if subscription.key not in self._in_flight
+                ])
+                self.stopping.wait(max(deadline - self.scheduler.clock(), 0))
+        finally:
+            logging.info('Остановка: ждём завершения начатых опросов')
+            self._executor.shutdown(wait=True)
+            self.after_cycle()
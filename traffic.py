@@ -0,0 +1,185 @@
+"""Record real traffic to a trace file and replay it.
+
+With TRAFFIC_RECORD set a worker writes every homework_statuses answer,
+failed request and Telegram call to a gzip file of JSON lines:
+
+    {"version":1,"started":1700000000.0}
+    {"t":0.12,"kind":"answer","subscription":"3f2a...","chat":"9c1e...",
+     "from_date":1700000000,"unchanged":false,"answer":{...}}
+    {"t":0.31,"kind":"send","chat":"9c1e...","text":"...","seconds":0.2}
+
+`t` is the time since the start of the recording. Tokens never reach the
+file: subscriptions are named by their key, chat ids are replaced by a
+hash and every configured secret is cut out of the serialized line.
+Streamed answers are read once by the pipeline, so they are not recorded.
+
+`replay` reads a trace back and hands each event to a handler of its
+kind, either at the recorded pace or as fast as possible.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+import exceptions
+
+TRAFFIC_RECORD = os.getenv('TRAFFIC_RECORD')
+TRACE_VERSION = 1
+REDACTED = '***'
+
+_recorder = None
+
+
+def pseudonym(chat_id) -> str:
+    """Return a stable name for a chat that does not reveal its id."""
+    return hashlib.sha256(str(chat_id).encode()).hexdigest()[:12]
+
+
+class TraceRecorder:
+    """Appends events to a compressed trace, one JSON object per line."""
+
+    def __init__(self, path, secrets=(), clock=time.monotonic):
+        """Open the trace at `path`; `secrets` are masked out."""
+        # Longest first, so a secret containing another is cut out whole.
+        self.secrets = sorted(
+            {json.dumps(secret)[1:-1] for secret in secrets if secret},
+            key=len, reverse=True,
+        )
+        self.clock = clock
+        self.started = clock()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wt', encoding='utf-8')
+        self._file.write(self._line(
+            {'version': TRACE_VERSION, 'started': time.time()}
+        ))
+
+    def _line(self, event) -> str:
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':'))
+        for secret in self.secrets:
+            line = line.replace(secret, REDACTED)
+        return line + '\n'
+
+    def write(self, kind, **fields):
+        """Record one event."""
+        event = {'t': round(self.clock() - self.started, 6), 'kind': kind}
+        event.update(fields)
+        line = self._line(event)
+        with self._lock:
+            self._file.write(line)
+
+    def close(self):
+        """Finish the gzip stream."""
+        with self._lock:
+            self._file.close()
+
+
+def start_recording(path, secrets=()) -> TraceRecorder:
+    """Record traffic of this process to `path`."""
+    global _recorder
+    _recorder = TraceRecorder(path, secrets)
+    return _recorder
+
+
+def stop_recording():
+    """Stop recording and close the trace, if one is open."""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+
+
+def record_answer(subscription, from_date, answer):
+    """Record an answer of the homework_statuses API."""
+    if _recorder is None or hasattr(answer, 'iter_homeworks'):
+        return
+    unchanged = getattr(answer, 'unchanged', False)
+    if unchanged:
+        # The homeworks repeat the previous answer; the pipeline skips them.
+        answer = {'current_date': answer.get('current_date'), 'homeworks': []}
+    _recorder.write(
+        'answer', subscription=subscription.key,
+        chat=pseudonym(subscription.chat_id), from_date=from_date,
+        unchanged=unchanged, answer=answer,
+    )
+
+
+def record_error(subscription, error):
+    """Record a failed request to the homework_statuses API."""
+    if _recorder is None:
+        return
+    _recorder.write(
+        'error', subscription=subscription.key,
+        chat=pseudonym(subscription.chat_id), error=type(error).__name__,
+        message=str(error), retry_after=getattr(error, 'retry_after', None),
+    )
+
+
+def record_send(chat_id, text, seconds, error=None):
+    """Record a Telegram call and how long it took."""
+    if _recorder is None:
+        return
+    fields = {'chat': pseudonym(chat_id), 'text': text, 'seconds': seconds}
+    if error is not None:
+        fields['error'] = type(error).__name__
+    _recorder.write('send', **fields)
+
+
+class ReplayBot:
+    """Stands in for telegram.Bot during a replay and keeps what was sent."""
+
+    def __init__(self):
+        """Start with no messages sent."""
+        self.sent = []
+
+    def send_message(self, chat_id, text):
+        """Remember a message instead of sending it."""
+        self.sent.append((chat_id, text))
+
+
+def read_trace(path):
+    """Yield the events of a trace in recorded order."""
+    with gzip.open(path, 'rt', encoding='utf-8') as file:
+        header = json.loads(file.readline())
+        if header.get('version') != TRACE_VERSION:
+            raise exceptions.MalformedPayload(
+                f'Неизвестная версия трассы: {header.get("version")}'
+            )
+        for line in file:
+            yield json.loads(line)
+
+
+def error_of(event) -> exceptions.SomethingWentWrong:
+    """Rebuild the exception of a recorded failure."""
+    error_class = getattr(exceptions, event['error'], None)
+    if not (isinstance(error_class, type)
+            and issubclass(error_class, exceptions.SomethingWentWrong)):
+        error_class = exceptions.SomethingWentWrong
+    error = error_class(event['message'])
+    if event.get('retry_after') is not None:
+        error.retry_after = event['retry_after']
+    return error
+
+
+def replay(path, handlers, speed=None, clock=time.monotonic,
+           sleep=time.sleep) -> Counter:
+    """Hand every event of a trace to the handler of its kind.
+
+    With `speed` the events keep their recorded spacing divided by it,
+    e.g. 1 for real time; without it they follow each other at once.
+    Events without a handler are only counted. Returns events per kind.
+    """
+    counts = Counter()
+    started = clock()
+    for event in read_trace(path):
+        if speed:
+            delay = event['t'] / speed - (clock() - started)
+            if delay > 0:
+                sleep(delay)
+        handler = handlers.get(event['kind'])
+        if handler is not None:
+            handler(event)
+        counts[event['kind']] += 1
+    return counts